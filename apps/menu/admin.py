@@ -2,7 +2,6 @@ from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from .models.menufreemodels.models import Category, Restaurant, MenuCategory, Food, ExchangeRate
-from .helper import update_all_food_prices
 
 
 # ----------------------------
@@ -267,8 +266,8 @@ class ExchangeRateAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
         if obj.is_active:
-            result = update_all_food_prices()
-            messages.info(request, result)
+            # به‌روزرسانی قیمت‌ها در پس‌زمینه (ExchangeRate.save) انجام می‌شود
+            messages.info(request, _('Food USD prices are being updated in the background.'))
 
     fieldsets = (
         (_('Exchange Rate Information'), {
@@ -0,0 +1,243 @@
+# apps/menu/cache.py
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+MENU_VERSION_KEY = 'menu:version:{slug}'
+MENU_GLOBAL_VERSION_KEY = 'menu:version:global'
+MENU_PAGE_KEY = 'menu:page:{slug}:{lang}:{scheme}:{host}:{version}'
+EXCHANGE_RATE_VERSION_KEY = 'menu:exchange_rate:version'
+RESTAURANT_REF_KEY = 'menu:restaurant:{slug}'
+OWNER_RESTAURANTS_KEY = 'menu:owner_restaurants:{owner_id}'
+
+# مدت پیش‌فرض نگهداری صفحه رندر شده منو (ثانیه)
+MENU_PAGE_CACHE_TIMEOUT = getattr(settings, 'MENU_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# مدت نگهداری نگاشت اسلاگ به رستوران (ثانیه)
+RESTAURANT_REF_CACHE_TIMEOUT = getattr(settings, 'RESTAURANT_REF_CACHE_TIMEOUT', 60 * 60 * 24)
+
+# فاصله بررسی دوباره نسخه نرخ ارز در کش مشترک (ثانیه)
+EXCHANGE_RATE_CHECK_INTERVAL = getattr(settings, 'EXCHANGE_RATE_CHECK_INTERVAL', 2)
+
+
+def _new_version():
+    return time.time_ns()
+
+
+# ----------------------------
+# نسخه منو
+# ----------------------------
+def get_menu_version(slug):
+    """
+    نسخه فعلی منوی یک رستوران
+
+    نسخه از ترکیب نسخه اختصاصی رستوران و نسخه سراسری (دسته‌بندی‌ها و نرخ ارز)
+    ساخته می‌شود؛ با تغییر هر کدام، تمام کلیدهای وابسته به نسخه قبلی بی‌اثر می‌شوند.
+    """
+    return get_menu_version_stamp(slug)[0]
+
+
+def get_menu_version_stamp(slug):
+    """
+    نسخه منو همراه با زمان آخرین تغییر آن
+
+    هر دو نسخه (اختصاصی و سراسری) زمان ساخته شدنشان به نانوثانیه است، پس زمان آخرین
+    تغییر منو بدون خواندن خود منو از همین دو کلید به دست می‌آید.
+
+    Returns:
+        tuple: (نسخه، datetime آخرین تغییر)
+    """
+    keys = [MENU_VERSION_KEY.format(slug=slug), MENU_GLOBAL_VERSION_KEY]
+    values = cache.get_many(keys)
+
+    for key in keys:
+        if key not in values:
+            # اگر کلید حذف شده باشد نسخه تازه می‌سازیم (add تا با وورکر دیگر تداخل نکند)
+            version = _new_version()
+            cache.add(key, version, None)
+            values[key] = cache.get(key, version)
+
+    slug_version, global_version = values[keys[0]], values[keys[1]]
+    changed_at = datetime.fromtimestamp(max(slug_version, global_version) / 1e9, tz=dt_timezone.utc)
+    return f"{slug_version}.{global_version}", changed_at
+
+
+def bump_menu_versions(slugs):
+    """تغییر نسخه منوی رستوران‌ها با اسلاگ‌های داده شده"""
+    slugs = {slug for slug in slugs if slug}
+    if not slugs:
+        return
+    version = _new_version()
+    cache.set_many({MENU_VERSION_KEY.format(slug=slug): version for slug in slugs}, None)
+
+
+def bump_restaurant_menus(restaurant_ids):
+    """تغییر نسخه منوی رستوران‌ها بر اساس شناسه"""
+    from .models.menufreemodels.models import Restaurant
+
+    restaurant_ids = {pk for pk in restaurant_ids if pk}
+    if not restaurant_ids:
+        return
+    bump_menu_versions(
+        Restaurant.objects.filter(id__in=restaurant_ids).values_list('slug', flat=True)
+    )
+
+
+def bump_global_menu_version():
+    """تغییر نسخه سراسری؛ منوی تمام رستوران‌ها نامعتبر می‌شود"""
+    cache.set(MENU_GLOBAL_VERSION_KEY, _new_version(), None)
+
+
+# ----------------------------
+# نگاشت اسلاگ به رستوران
+# ----------------------------
+RestaurantRef = namedtuple('RestaurantRef', ['id', 'owner_id', 'isActive', 'expireDate'])
+
+# برای اسلاگ‌های ناموجود هم نتیجه کش می‌شود
+_MISSING_RESTAURANT = 'missing'
+
+
+def resolve_restaurant(slug):
+    """
+    اطلاعات پایه رستوران (شناسه، مالک، وضعیت و تاریخ انقضا) از روی اسلاگ
+
+    نتیجه در کش مشترک نگهداری می‌شود و با ذخیره یا حذف رستوران نامعتبر می‌شود.
+
+    Returns:
+        RestaurantRef | None: None اگر رستورانی با این اسلاگ وجود نداشته باشد
+    """
+    from .models.menufreemodels.models import Restaurant
+
+    key = RESTAURANT_REF_KEY.format(slug=slug)
+    value = cache.get(key)
+    if value is None:
+        row = Restaurant.objects.filter(slug=slug).values_list('id', 'owner_id', 'isActive', 'expireDate').first()
+        value = tuple(row) if row else _MISSING_RESTAURANT
+        cache.set(key, value, RESTAURANT_REF_CACHE_TIMEOUT)
+
+    if value == _MISSING_RESTAURANT:
+        return None
+    return RestaurantRef(*value)
+
+
+def restaurant_ref_is_expired(ref):
+    return bool(ref.expireDate) and timezone.now() > ref.expireDate
+
+
+def invalidate_restaurant_refs(slugs):
+    slugs = {slug for slug in slugs if slug}
+    if slugs:
+        cache.delete_many([RESTAURANT_REF_KEY.format(slug=slug) for slug in slugs])
+
+
+def get_owner_restaurants(owner_id):
+    """لیست رستوران‌های فعال یک کاربر (کش شده)"""
+    from .models.menufreemodels.models import Restaurant
+
+    key = OWNER_RESTAURANTS_KEY.format(owner_id=owner_id)
+    restaurants = cache.get(key)
+    if restaurants is None:
+        restaurants = list(Restaurant.objects.filter(owner_id=owner_id, isActive=True))
+        cache.set(key, restaurants, RESTAURANT_REF_CACHE_TIMEOUT)
+    return restaurants
+
+
+def invalidate_owner_restaurants(owner_ids):
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id}
+    if owner_ids:
+        cache.delete_many([OWNER_RESTAURANTS_KEY.format(owner_id=owner_id) for owner_id in owner_ids])
+
+
+# ----------------------------
+# کش صفحه رندر شده منو
+# ----------------------------
+def menu_page_cache_key(request, slug, lang, version):
+    return MENU_PAGE_KEY.format(
+        slug=slug,
+        lang=lang,
+        scheme=request.scheme,
+        host=request.get_host(),
+        version=version,
+    )
+
+
+def is_menu_page_cacheable(request):
+    """
+    فقط درخواست‌های GET بدون پارامتر اضافه کش می‌شوند؛
+    آدرس کامل درخواست در canonical و JSON-LD صفحه قرار می‌گیرد.
+    """
+    return request.method == 'GET' and set(request.GET.keys()) <= {'lang'}
+
+
+def get_menu_page_timeout(expire_date):
+    """مدت کش صفحه؛ حداکثر تا لحظه انقضای رستوران"""
+    if not expire_date:
+        return MENU_PAGE_CACHE_TIMEOUT
+    seconds_left = int((expire_date - timezone.now()).total_seconds())
+    return max(0, min(MENU_PAGE_CACHE_TIMEOUT, seconds_left))
+
+
+# ----------------------------
+# کش نرخ ارز در حافظه هر پروسس
+# ----------------------------
+_exchange_rate = {'rate': None, 'version': None, 'checked_at': 0.0}
+_exchange_rate_lock = threading.Lock()
+
+
+def _load_exchange_rate():
+    from .models.menufreemodels.models import ExchangeRate
+
+    return ExchangeRate.objects.filter(is_active=True).values_list('rate', flat=True).first()
+
+
+def get_cached_exchange_rate():
+    """
+    نرخ ارز فعال از حافظه پروسس
+
+    نسخه نرخ در کش مشترک نگهداری می‌شود و هر EXCHANGE_RATE_CHECK_INTERVAL ثانیه
+    بررسی می‌شود؛ فقط در صورت تغییر نسخه، نرخ دوباره از دیتابیس خوانده می‌شود.
+
+    Returns:
+        Decimal | None: نرخ فعال یا None اگر نرخ فعالی ثبت نشده باشد
+    """
+    now = time.monotonic()
+    state = _exchange_rate
+    if state['version'] is not None and now - state['checked_at'] < EXCHANGE_RATE_CHECK_INTERVAL:
+        return state['rate']
+
+    with _exchange_rate_lock:
+        version = cache.get(EXCHANGE_RATE_VERSION_KEY)
+        if version is None:
+            version = _new_version()
+            cache.add(EXCHANGE_RATE_VERSION_KEY, version, None)
+            version = cache.get(EXCHANGE_RATE_VERSION_KEY, version)
+
+        if version != state['version']:
+            try:
+                rate = _load_exchange_rate()
+            except DatabaseError:
+                # نسخه ثبت نمی‌شود تا بررسی بعدی دوباره از دیتابیس بخواند؛ تا آن موقع نرخ قبلی
+                logger.exception("خطا در خواندن نرخ ارز")
+                state['checked_at'] = now
+                return state['rate']
+            state['rate'] = rate
+            state['version'] = version
+        state['checked_at'] = now
+        return state['rate']
+
+
+def invalidate_exchange_rate():
+    """نامعتبر کردن نرخ ارز در همه وورکرها و منوی همه رستوران‌ها"""
+    with _exchange_rate_lock:
+        _exchange_rate.update(rate=None, version=None, checked_at=0.0)
+    cache.set(EXCHANGE_RATE_VERSION_KEY, _new_version(), None)
+    bump_global_menu_version()
@@ -0,0 +1,104 @@
+# apps/menu/categories.py
+import threading
+import time
+from django.core.cache import cache
+
+
+CATEGORY_TREE_VERSION_KEY = 'menu:category_tree:version'
+
+_tree = {'version': None, 'roots': [], 'nodes': {}}
+_tree_lock = threading.Lock()
+
+
+def _children_map(categories):
+    children = {}
+    for category in sorted(categories, key=lambda item: (item.displayOrder or 0, item.id)):
+        children.setdefault(category.parent_id, []).append(category)
+    return children
+
+
+def flatten_active_subtree(root, descendants):
+    """
+    زیرمجموعه‌های فعال یک دسته‌بندی به ترتیب پیمایش عمقی
+
+    زیرمجموعه‌های یک دسته‌بندی غیرفعال (حتی اگر خودشان فعال باشند) حذف می‌شوند.
+    """
+    children = _children_map(descendants.filter(isActive=True))
+    result = []
+    stack = list(reversed(children.get(root.pk, [])))
+    while stack:
+        category = stack.pop()
+        result.append(category)
+        stack.extend(reversed(children.get(category.pk, [])))
+    return result
+
+
+# ----------------------------
+# درخت دسته‌بندی‌های فعال در حافظه هر پروسس
+# ----------------------------
+def _load_tree():
+    """ساخت درخت دسته‌بندی‌های فعال با یک کوئری"""
+    from .models.menufreemodels.models import Category
+
+    storage = Category._meta.get_field('image').storage
+    rows = Category.objects.filter(isActive=True).order_by('depth', 'displayOrder', 'id').values(
+        'id', 'title', 'title_en', 'image', 'parent_id', 'path'
+    )
+
+    roots, nodes = [], {}
+    for row in rows:
+        node = {
+            'id': row['id'],
+            'title': row['title'],
+            'title_en': row['title_en'],
+            'image_url': storage.url(row['image']) if row['image'] else '',
+            'parent_id': row['parent_id'],
+            'path': row['path'],
+            'children': [],
+        }
+        if row['parent_id'] is None:
+            roots.append(node)
+        elif row['parent_id'] in nodes:
+            nodes[row['parent_id']]['children'].append(node)
+        else:
+            # والد غیرفعال است؛ این شاخه نمایش داده نمی‌شود
+            continue
+        nodes[row['id']] = node
+    return roots, nodes
+
+
+def _current_tree():
+    version = cache.get(CATEGORY_TREE_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(CATEGORY_TREE_VERSION_KEY, version, None)
+        version = cache.get(CATEGORY_TREE_VERSION_KEY, version)
+
+    if _tree['version'] != version:
+        with _tree_lock:
+            if _tree['version'] != version:
+                roots, nodes = _load_tree()
+                _tree.update(version=version, roots=roots, nodes=nodes)
+    return _tree
+
+
+def get_active_category_tree():
+    """
+    درخت دسته‌بندی‌های فعال (فقط خواندنی)
+
+    درخت در حافظه پروسس نگهداری می‌شود و فقط با تغییر دسته‌بندی‌ها
+    (نسخه در کش مشترک) دوباره ساخته می‌شود.
+
+    Returns:
+        list: گره‌های ریشه؛ هر گره شامل id, title, title_en, image_url, parent_id, path, children
+    """
+    return _current_tree()['roots']
+
+
+def get_category_subtree(category_id):
+    """گره یک دسته‌بندی فعال همراه با زیرمجموعه‌هایش یا None"""
+    return _current_tree()['nodes'].get(category_id)
+
+
+def invalidate_category_tree():
+    cache.set(CATEGORY_TREE_VERSION_KEY, time.time_ns(), None)
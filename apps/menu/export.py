@@ -0,0 +1,151 @@
+# apps/menu/export.py
+import json
+import os
+import shutil
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import RequestFactory
+from django.urls import reverse
+from .models.menufreemodels.models import Restaurant
+from .snapshot import MENU_LANGUAGES, get_menu_snapshot, get_snapshot_version, build_compact_menu
+from .views.freemenuviews.views import render_menu_page, serialize_foods
+
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def get_export_root():
+    return getattr(settings, 'STATIC_MENU_ROOT', os.path.join(settings.BASE_DIR, 'static_menus'))
+
+
+def _page_name(lang):
+    return 'index.html' if lang == 'fa' else f'index.{lang}.html'
+
+
+def _foods_name(lang):
+    return 'foods.json' if lang == 'fa' else f'foods.{lang}.json'
+
+
+def _menu_json_name(lang):
+    return 'menu.json' if lang == 'fa' else f'menu.{lang}.json'
+
+
+def _build_request(slug, lang):
+    """درخواست ساختگی برای رندر قالب منو خارج از چرخه درخواست/پاسخ"""
+    base_url = urlsplit(getattr(settings, 'STATIC_MENU_BASE_URL', 'http://localhost:8000'))
+    request = RequestFactory().get(
+        reverse('menu:digital_menu', kwargs={'restaurant_slug': slug}),
+        {} if lang == 'fa' else {'lang': lang},
+        secure=base_url.scheme == 'https',
+        HTTP_HOST=base_url.netloc,
+    )
+    request.user = AnonymousUser()
+    return request
+
+
+def _write_file(path, content):
+    """نوشتن اتمیک فایل تا nginx هیچ‌وقت فایل نیمه‌کاره نبیند"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def _load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_restaurant_menu(restaurant, root):
+    """رندر منوی یک رستوران (همه زبان‌ها) در پوشه خروجی"""
+    directory = os.path.join(root, restaurant.slug)
+    os.makedirs(directory, exist_ok=True)
+
+    version = None
+    for lang in MENU_LANGUAGES:
+        snapshot = get_menu_snapshot(restaurant.slug, lang, restaurant=restaurant)
+        version = snapshot['version']
+        response = render_menu_page(_build_request(restaurant.slug, lang), restaurant, snapshot, lang)
+        _write_file(os.path.join(directory, _page_name(lang)), response.content)
+        _write_file(
+            os.path.join(directory, _foods_name(lang)),
+            json.dumps({'foods': serialize_foods(snapshot['foods']), 'expired': False},
+                       cls=DjangoJSONEncoder, ensure_ascii=False).encode()
+        )
+        _write_file(
+            os.path.join(directory, _menu_json_name(lang)),
+            json.dumps(build_compact_menu(snapshot), cls=DjangoJSONEncoder,
+                       ensure_ascii=False, separators=(',', ':')).encode()
+        )
+    return version
+
+
+def export_static_menus(force=False, slugs=None):
+    """
+    خروجی استاتیک منوی رستوران‌های فعال و منقضی نشده
+
+    فقط رستوران‌هایی که نسخه منوی آنها از آخرین خروجی تغییر کرده دوباره رندر می‌شوند
+    و پوشه رستوران‌های غیرفعال یا منقضی شده حذف می‌شود تا درخواست به جنگو برسد.
+
+    Returns:
+        dict: تعداد رستوران‌های رندر شده، بدون تغییر و حذف شده
+    """
+    root = get_export_root()
+    os.makedirs(root, exist_ok=True)
+    manifest = _load_manifest(root)
+
+    restaurants = Restaurant.get_active_restaurants().filter(isActive=True).exclude(slug__isnull=True).exclude(slug='')
+    if slugs:
+        restaurants = restaurants.filter(slug__in=slugs)
+
+    exported, unchanged = 0, 0
+    active_slugs = set()
+    for restaurant in restaurants.iterator():
+        active_slugs.add(restaurant.slug)
+        if not force and manifest.get(restaurant.slug) == get_snapshot_version(restaurant.slug):
+            unchanged += 1
+            continue
+        manifest[restaurant.slug] = export_restaurant_menu(restaurant, root)
+        exported += 1
+
+    removed = 0
+    if not slugs:
+        for slug in set(manifest) - active_slugs:
+            shutil.rmtree(os.path.join(root, slug), ignore_errors=True)
+            del manifest[slug]
+            removed += 1
+
+    _write_file(os.path.join(root, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+
+    return {'exported': exported, 'unchanged': unchanged, 'removed': removed}
+
+
+def remove_static_menus(slugs):
+    """
+    حذف فوری خروجی استاتیک رستوران‌ها (مثلاً بعد از غیرفعال شدن)
+
+    تا اجرای بعدی export_static_menus منتظر نمی‌مانیم تا nginx منوی منقضی را سرو نکند.
+
+    Returns:
+        int: تعداد پوشه‌های حذف شده
+    """
+    root = get_export_root()
+    slugs = {slug for slug in slugs if slug}
+    removed = 0
+    for slug in slugs:
+        directory = os.path.join(root, slug)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+
+    manifest = _load_manifest(root)
+    if slugs & set(manifest):
+        for slug in slugs:
+            manifest.pop(slug, None)
+        _write_file(os.path.join(root, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    return removed
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.menu.export import export_static_menus
+
+
+class Command(BaseCommand):
+    help = 'Render active restaurant menus to static HTML/JSON files for nginx'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render every menu even if unchanged')
+        parser.add_argument('--slug', action='append', dest='slugs', help='Only export the given restaurant slug')
+
+    def handle(self, *args, **options):
+        result = export_static_menus(force=options['force'], slugs=options['slugs'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['exported']} exported, {result['unchanged']} unchanged, {result['removed']} removed"
+        ))
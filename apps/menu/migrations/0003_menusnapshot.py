@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lang', models.CharField(max_length=5, verbose_name='زبان')),
+                ('version', models.CharField(max_length=64, verbose_name='نسخه منو')),
+                ('data', models.JSONField(default=dict, verbose_name='داده منو')),
+                ('builtAt', models.DateTimeField(auto_now=True, verbose_name='زمان ساخت')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menuSnapshots', to='menu.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Menu Snapshot',
+                'verbose_name_plural': 'Menu Snapshots',
+                'unique_together': {('restaurant', 'lang')},
+            },
+        ),
+    ]
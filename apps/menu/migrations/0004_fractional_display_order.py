@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menusnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='food',
+            name='displayOrder',
+            field=models.FloatField(blank=True, default=0, null=True),
+        ),
+        migrations.AlterField(
+            model_name='menucategory',
+            name='displayOrder',
+            field=models.FloatField(blank=True, default=0, null=True),
+        ),
+    ]
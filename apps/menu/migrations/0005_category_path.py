@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model('menu', 'Category')
+    categories = {category.id: category for category in Category.objects.only('id', 'parent_id')}
+
+    def build_path(category, seen=()):
+        if category.parent_id and category.parent_id in categories and category.parent_id not in seen:
+            return build_path(categories[category.parent_id], seen + (category.id,)) + f"{category.id}/"
+        return f"{category.id}/"
+
+    for category in categories.values():
+        category.path = build_path(category)
+        category.depth = category.path.count('/') - 1
+    Category.objects.bulk_update(categories.values(), ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_fractional_display_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+# همان ORDER_STEP در apps/menu/ordering.py
+ORDER_STEP = 1024.0
+
+
+def _spread(model, rows):
+    """کلیدهای متمایز با فاصله ORDER_STEP برای ردیف‌های مرتب شده (با حفظ ترتیب فعلی)"""
+    return [
+        model(id=item_id, displayOrder=position * ORDER_STEP)
+        for position, (item_id, key) in enumerate(rows, start=1)
+        if key != position * ORDER_STEP
+    ]
+
+
+def seed_display_order(apps, schema_editor):
+    Food = apps.get_model('menu', 'Food')
+    MenuCategory = apps.get_model('menu', 'MenuCategory')
+
+    # غذاها بین رستوران‌ها مشترک هستند؛ ترتیب سراسری همه رستوران‌ها را حفظ می‌کند
+    foods = _spread(Food, Food.objects.order_by('displayOrder', 'id').values_list('id', 'displayOrder'))
+    Food.objects.bulk_update(foods, ['displayOrder'], batch_size=500)
+
+    rows_by_restaurant = {}
+    for restaurant_id, item_id, key in MenuCategory.objects.order_by(
+        'restaurant_id', 'displayOrder', 'id'
+    ).values_list('restaurant_id', 'id', 'displayOrder'):
+        rows_by_restaurant.setdefault(restaurant_id, []).append((item_id, key))
+    menu_categories = [item for rows in rows_by_restaurant.values() for item in _spread(MenuCategory, rows)]
+    MenuCategory.objects.bulk_update(menu_categories, ['displayOrder'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_category_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_display_order, migrations.RunPython.noop),
+    ]
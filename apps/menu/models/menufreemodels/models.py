@@ -1,8 +1,10 @@
 import os
 from uuid import uuid4
 from decimal import Decimal
-from django.db import models
-from django.utils.text import slugify
+from django.db import models, transaction
+from django.db.models import F, Value, Min, Max, Count
+from django.db.models.functions import Cast, Floor, Concat, Substr
+from ...slugs import save_with_unique_slug
 from apps.user.models import CustomUser
 from django.utils.translation import gettext as _
 from django.conf import settings
@@ -26,17 +28,16 @@ class BaseModel(models.Model):
         abstract = True
         ordering = ['displayOrder']
 
-    def save(self, *args, **kwargs):
+    def get_slug_source(self):
+        """متن ساخت اسلاگ؛ None یعنی اسلاگ ساخته نشود"""
         # ساخت اسلاگ بر اساس عنوان انگلیسی یا فارسی
+        return self.title_en or self.title or "item"
+
+    def save(self, *args, **kwargs):
         if not self.slug:
-            base_title = self.title_en or self.title or "item"
-            base_slug = slugify(base_title)
-            slug = base_slug
-            counter = 1
-            while self.__class__.objects.filter(slug=slug).exclude(id=self.id).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            source = self.get_slug_source()
+            if source:
+                return save_with_unique_slug(self, source, lambda: super(BaseModel, self).save(*args, **kwargs))
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -94,11 +95,44 @@ def upload_to_food_sound(instance, filename):
 class Category(BaseModel):
     image = models.ImageField(upload_to=upload_to_category, null=True, blank=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    # مسیر شناسه‌ها از ریشه تا همین دسته‌بندی، مثل "3/17/42/" (برای خواندن زیردرخت با یک کوئری)
+    path = models.CharField(max_length=255, db_index=True, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta(BaseModel.Meta):
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
 
+    def save(self, *args, **kwargs):
+        # مسیر فعلی خود و والد از دیتابیس (نمونه‌های داخل حافظه ممکن است قدیمی باشند)
+        paths = dict(Category.objects.filter(
+            pk__in=[pk for pk in (self.pk, self.parent_id) if pk]
+        ).values_list('id', 'path'))
+        old_path = paths.get(self.pk, '')
+        parent_path = paths.get(self.parent_id, '')
+
+        if self.parent_id and old_path and parent_path.startswith(old_path):
+            raise ValueError("دسته‌بندی نمی‌تواند زیرمجموعه خودش یا فرزندانش باشد")
+
+        # یک تراکنش تا نامعتبرسازی درخت (on_commit در سیگنال post_save) بعد از نوشتن مسیر
+        # و عمق جدید اجرا شود، نه بین save و _update_path
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._update_path(old_path, parent_path)
+
+    def _update_path(self, old_path, parent_path):
+        """به‌روزرسانی مسیر این دسته‌بندی و همه زیرمجموعه‌ها با دو دستور UPDATE"""
+        new_path = f"{parent_path}{self.pk}/"
+        depth = new_path.count('/') - 1
+        if new_path != old_path:
+            Category.objects.filter(pk=self.pk).update(path=new_path, depth=depth)
+            if old_path:
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (depth - (old_path.count('/') - 1)),
+                )
+        self.path, self.depth = new_path, depth
+
     @property
     def is_parent(self):
         return self.children.exists()
@@ -108,11 +142,11 @@ class Category(BaseModel):
         return self.children.filter(isActive=True)
 
     def get_all_subcategories(self):
-        subcategories = []
-        for child in self.children.filter(isActive=True):
-            subcategories.append(child)
-            subcategories.extend(child.get_all_subcategories())
-        return subcategories
+        """همه زیرمجموعه‌های فعال (به ترتیب درخت) با یک کوئری روی مسیر"""
+        from ...categories import flatten_active_subtree
+
+        descendants = Category.objects.filter(path__startswith=self.path).exclude(pk=self.pk)
+        return flatten_active_subtree(self, descendants)
 
 
 # ----------------------------
@@ -152,18 +186,12 @@ class Restaurant(BaseModel):
         if self.closingTime == "":
             self.closingTime = None
 
-        # ساخت اسلاگ بر اساس نام انگلیسی
-        if not self.slug and self.english_name:
-            base_slug = slugify(self.english_name)
-            slug = base_slug
-            counter = 1
-            while Restaurant.objects.filter(slug=slug).exclude(id=self.id).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-
         super().save(*args, **kwargs)
 
+    def get_slug_source(self):
+        # ساخت اسلاگ بر اساس نام انگلیسی
+        return self.english_name
+
     def __str__(self):
         return self.title or self.title_en or self.english_name or "Restaurant"
 
@@ -280,6 +308,54 @@ class Restaurant(BaseModel):
         """لیست تمام رستوران‌های منقضی شده را برمی‌گرداند"""
         return cls.objects.filter(expireDate__lt=timezone.now())
 
+    @classmethod
+    def deactivate_expired(cls, restaurant_ids=None):
+        """
+        غیرفعال کردن تمام رستوران‌های منقضی شده با یک دستور UPDATE
+
+        save و سیگنال‌ها برای تک‌تک ردیف‌ها اجرا نمی‌شوند؛ کش اسلاگ، لیست رستوران‌های
+        مالک، نسخه منو و خروجی استاتیک همه رستوران‌های غیرفعال شده یکجا بعد از commit
+        نامعتبر می‌شود.
+
+        Args:
+            restaurant_ids: محدود کردن به این رستوران‌ها (None یعنی همه)
+
+        Returns:
+            list: (id, title, slug, owner_id) رستوران‌های غیرفعال شده
+        """
+        from ...cache import bump_menu_versions, invalidate_restaurant_refs, invalidate_owner_restaurants
+
+        expired = cls.get_expired_restaurants().filter(isActive=True)
+        if restaurant_ids is not None:
+            expired = expired.filter(id__in=restaurant_ids)
+
+        with transaction.atomic():
+            deactivated = list(
+                expired.select_for_update().values_list('id', 'title', 'slug', 'owner_id')
+            )
+            if not deactivated:
+                return []
+
+            cls.objects.filter(
+                id__in=[row[0] for row in deactivated],
+                isActive=True
+            ).update(isActive=False, updatedAt=timezone.now())
+
+            slugs = [row[2] for row in deactivated]
+            owner_ids = [row[3] for row in deactivated]
+
+            def invalidate():
+                from ...export import remove_static_menus
+
+                invalidate_restaurant_refs(slugs)
+                invalidate_owner_restaurants(owner_ids)
+                bump_menu_versions(slugs)
+                # خروجی استاتیک مستقیم توسط nginx سرو می‌شود و باید همین حالا حذف شود
+                remove_static_menus(slugs)
+
+            transaction.on_commit(invalidate)
+        return deactivated
+
     @classmethod
     def get_active_restaurants(cls):
         """لیست تمام رستوران‌های فعال (منقضی نشده) را برمی‌گرداند"""
@@ -307,7 +383,8 @@ class MenuCategory(models.Model):
     customTitle = models.CharField(max_length=255, null=True, blank=True, verbose_name="عنوان سفارشی فارسی")
     customTitle_en = models.CharField(max_length=255, null=True, blank=True, verbose_name="عنوان سفارشی انگلیسی")
     customImage = models.ImageField(upload_to=upload_to_menu_category, null=True, blank=True)
-    displayOrder = models.IntegerField(default=0, null=True, blank=True)
+    # کلید ترتیب کسری (apps/menu/ordering.py)
+    displayOrder = models.FloatField(default=0, null=True, blank=True)
     isActive = models.BooleanField(default=True, null=True, blank=True)
     createdAt = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updatedAt = models.DateTimeField(auto_now=True, null=True, blank=True)
@@ -355,6 +432,8 @@ class Food(BaseModel):
     price = models.PositiveIntegerField(null=True, blank=True, verbose_name="قیمت (تومان)")
     price_usd_cents = models.PositiveIntegerField(null=True, blank=True, verbose_name="قیمت (سنت)")
     preparationTime = models.IntegerField(help_text="زمان آماده‌سازی (دقیقه)", null=True, blank=True)
+    # کلید ترتیب کسری؛ جابجایی یک غذا فقط همان ردیف را تغییر می‌دهد (apps/menu/ordering.py)
+    displayOrder = models.FloatField(default=0, null=True, blank=True)
     created_by = models.CharField(
         max_length=20,
         choices=[('company', 'شرکت'), ('restaurant', 'رستوران')],
@@ -371,23 +450,44 @@ class Food(BaseModel):
         if self.price is not None and self.price_usd_cents is None:
             self.update_usd_price()
 
-        if not self.slug and (self.title or self.title_en):
-            base_slug = slugify(self.title_en or self.title)
-            slug = base_slug
-            counter = 1
-            # ❌ اصلاح شده: حذف شرط restaurant چون فیلد جداگانه نیست
-            while Food.objects.filter(slug=slug).exclude(id=self.id).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
-
         super().save(*args, **kwargs)
 
+    def get_slug_source(self):
+        return self.title_en or self.title
+
 
     def is_selected_by_restaurant(self, restaurant):
         """بررسی می‌کند که آیا این غذا توسط رستوران انتخاب شده است"""
         return self.restaurants.filter(id=restaurant.id).exists()
 
+    @classmethod
+    def reorder_for_restaurant(cls, restaurant, positions):
+        """
+        تغییر ترتیب نمایش چند غذا با یک کوئری بررسی و یک دستور UPDATE
+
+        Args:
+            positions: dict شناسه غذا -> displayOrder
+
+        Raises:
+            Food.DoesNotExist: اگر یکی از غذاها متعلق به این رستوران نباشد
+        """
+        from ...cache import bump_menu_versions
+
+        food_ids = set(positions)
+        owned_ids = set(cls.objects.filter(id__in=food_ids, restaurants=restaurant).values_list('id', flat=True))
+        if owned_ids != food_ids:
+            raise cls.DoesNotExist("No Food matches the given query.")
+
+        now = timezone.now()
+        foods = [cls(id=food_id, displayOrder=order, updatedAt=now) for food_id, order in positions.items()]
+        with transaction.atomic():
+            cls.objects.bulk_update(foods, ['displayOrder', 'updatedAt'])
+
+            # غذاهای شرکت بین چند رستوران مشترک هستند؛ منوی همه آنها نامعتبر می‌شود
+            slugs = Restaurant.objects.filter(foods__id__in=food_ids).values_list('slug', flat=True).distinct()
+            transaction.on_commit(lambda: bump_menu_versions(list(slugs)))
+        return len(foods)
+
     def toggle_for_restaurant(self, restaurant):
         """تغییر وضعیت انتخاب غذا برای رستوران"""
         if self.restaurants.filter(id=restaurant.id).exists():
@@ -426,19 +526,22 @@ class Food(BaseModel):
     def current_exchange_rate(self):
         return get_current_exchange_rate()
 
-    def get_price_display(self, lang='fa'):
-        if lang == 'en':
-            if self.price_usd_cents:
-                usd_amount = Decimal(self.price_usd_cents) / Decimal(100)
-                return f"${usd_amount:.2f}"
-            elif self.price:
+    def get_price_usd_amount(self, exchange_rate=None):
+        """مبلغ دلاری غذا؛ در صورت نبود قیمت سنت از نرخ ارز محاسبه می‌شود"""
+        if self.price_usd_cents:
+            return Decimal(self.price_usd_cents) / Decimal(100)
+        elif self.price:
+            if exchange_rate is None:
                 exchange_rate = get_current_exchange_rate()
-                if exchange_rate:
-                    usd_amount = Decimal(self.price) / Decimal(exchange_rate)
-                    return f"${usd_amount:.2f}"
-            return "$0.00"
+            if exchange_rate:
+                return Decimal(self.price) / Decimal(exchange_rate)
+        return Decimal(0)
+
+    def get_price_display(self, lang='fa', exchange_rate=None):
+        if lang == 'en':
+            return f"${self.get_price_usd_amount(exchange_rate):.2f}"
         else:
-            from django.contrib.humanize.templatags.humanize import intcomma
+            from django.contrib.humanize.templatetags.humanize import intcomma
             return f"{intcomma(self.price or 0)} تومان"
 
     def __str__(self):
@@ -458,21 +561,50 @@ class ExchangeRate(models.Model):
         verbose_name = 'نرخ ارز'
         verbose_name_plural = 'نرخ‌های ارز'
 
+    # تعداد غذاهایی که در هر دستور UPDATE به‌روزرسانی می‌شوند
+    PRICE_UPDATE_CHUNK_SIZE = 5000
+
     def save(self, *args, **kwargs):
         if self.is_active:
             ExchangeRate.objects.filter(is_active=True).exclude(id=self.id).update(is_active=False)
         super().save(*args, **kwargs)
         if self.is_active:
-            self.update_all_food_prices()
+            # محاسبه دوباره قیمت دلاری در پس‌زمینه؛ بعد از commit تا وورکر نرخ جدید را ببیند
+            from ...tasks import update_food_usd_prices_task
+            transaction.on_commit(lambda: update_food_usd_prices_task.delay(self.id))
+
+    def update_all_food_prices(self, progress=None):
+        """
+        محاسبه دوباره قیمت دلاری همه غذاها با دستورات UPDATE روی بازه‌های شناسه
 
-    def update_all_food_prices(self):
+        Args:
+            progress: تابع اختیاری (done, total) برای گزارش پیشرفت
+        """
         try:
             foods = Food.objects.filter(price__isnull=False)
+            bounds = foods.aggregate(first=Min('id'), last=Max('id'), total=Count('id'))
+            total = bounds['total']
             updated_count = 0
-            for food in foods:
-                food.update_usd_price(self.rate)
-                food.save(update_fields=['price_usd_cents'])
-                updated_count += 1
+
+            if total:
+                rate = Decimal(self.rate)
+                if rate > 0:
+                    price_usd_cents = Cast(Floor(F('price') * 100 / Value(rate)), models.PositiveIntegerField())
+                else:
+                    price_usd_cents = Value(0)
+
+                for start in range(bounds['first'], bounds['last'] + 1, self.PRICE_UPDATE_CHUNK_SIZE):
+                    updated_count += foods.filter(
+                        id__gte=start,
+                        id__lt=start + self.PRICE_UPDATE_CHUNK_SIZE
+                    ).update(price_usd_cents=price_usd_cents)
+                    if progress:
+                        progress(updated_count, total)
+
+            # قیمت‌های دلاری منو عوض شده‌اند
+            from ...cache import bump_global_menu_version
+            bump_global_menu_version()
+
             return f"تعداد {updated_count} غذا با نرخ {self.rate} به‌روزرسانی شد"
         except Exception as e:
             return f"خطا در به‌روزرسانی قیمت‌ها: {str(e)}"
@@ -481,6 +613,26 @@ class ExchangeRate(models.Model):
         return f"1 USD = {self.rate} Toman"
 
 
+# ----------------------------
+# Menu Snapshot
+# ----------------------------
+class MenuSnapshot(models.Model):
+    """نسخه از پیش ساخته شده منوی هر رستوران برای هر زبان"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menuSnapshots')
+    lang = models.CharField(max_length=5, verbose_name="زبان")
+    version = models.CharField(max_length=64, verbose_name="نسخه منو")
+    data = models.JSONField(default=dict, verbose_name="داده منو")
+    builtAt = models.DateTimeField(auto_now=True, verbose_name="زمان ساخت")
+
+    class Meta:
+        unique_together = ['restaurant', 'lang']
+        verbose_name = 'Menu Snapshot'
+        verbose_name_plural = 'Menu Snapshots'
+
+    def __str__(self):
+        return f"{self.restaurant} - {self.lang}"
+
+
 # ----------------------------
 # Helper functions
 # ----------------------------
@@ -495,10 +647,10 @@ def update_all_food_prices():
 
 
 def get_current_exchange_rate():
-    try:
-        current_rate = ExchangeRate.objects.filter(is_active=True).first()
-        if current_rate:
-            return current_rate.rate
-    except:
-        pass
+    """نرخ ارز فعال (از کش حافظه پروسس)"""
+    from ...cache import get_cached_exchange_rate
+
+    rate = get_cached_exchange_rate()
+    if rate:
+        return rate
     return getattr(settings, 'EXCHANGE_RATE', Decimal('60000.00'))
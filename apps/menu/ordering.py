@@ -0,0 +1,163 @@
+# apps/menu/ordering.py
+from django.db import transaction
+from django.utils import timezone
+
+
+# فاصله کلیدهای ترتیب بعد از متعادل‌سازی
+ORDER_STEP = 1024.0
+
+# کمترین فاصله قابل تقسیم بین دو کلید؛ کمتر از این یعنی نیاز به متعادل‌سازی
+MIN_ORDER_GAP = 1e-6
+
+
+def order_key_between(prev_key, next_key):
+    """
+    کلید ترتیب بین دو آیتم همسایه (ترتیب کسری)
+
+    Returns:
+        float | None: None اگر فاصله دو کلید برای تقسیم کافی نباشد
+    """
+    if prev_key is None and next_key is None:
+        return ORDER_STEP
+    if prev_key is None:
+        return next_key - ORDER_STEP
+    if next_key is None:
+        return prev_key + ORDER_STEP
+    if next_key - prev_key < MIN_ORDER_GAP:
+        return None
+    return (prev_key + next_key) / 2
+
+
+def needs_rebalance(keys):
+    """کلیدهای مرتب شده تکراری، خالی یا بیش از حد نزدیک دارند؟"""
+    if any(key is None for key in keys):
+        return True
+    return any(current - previous < MIN_ORDER_GAP for previous, current in zip(keys, keys[1:]))
+
+
+def rebalance(queryset):
+    """
+    شماره‌گذاری دوباره کلیدها با فاصله ORDER_STEP با حفظ ترتیب فعلی
+
+    Returns:
+        list: شناسه ردیف‌های تغییر کرده
+    """
+    model = queryset.model
+    now = timezone.now()
+    changed = []
+    rows = queryset.order_by('displayOrder', 'id').values_list('id', 'displayOrder')
+    for position, (item_id, key) in enumerate(rows, start=1):
+        new_key = position * ORDER_STEP
+        if key != new_key:
+            changed.append(model(id=item_id, displayOrder=new_key, updatedAt=now))
+
+    if changed:
+        model.objects.bulk_update(changed, ['displayOrder', 'updatedAt'], batch_size=500)
+    return [item.id for item in changed]
+
+
+def _crowded_runs(keys):
+    """بازه‌های [i, j] از کلیدهای مرتب شده که خالی هستند یا فاصله کافی با هم ندارند"""
+    runs, start = [], None
+    for index in range(len(keys)):
+        crowded_with_next = index + 1 < len(keys) and (
+            keys[index] is None or keys[index + 1] is None or keys[index + 1] - keys[index] < MIN_ORDER_GAP
+        )
+        if crowded_with_next and start is None:
+            start = index
+        elif not crowded_with_next and start is not None:
+            runs.append((start, index))
+            start = None
+        elif not crowded_with_next and keys[index] is None:
+            runs.append((index, index))
+    return runs
+
+
+def spread_crowded(queryset):
+    """
+    متعادل‌سازی با کمترین تغییر: فقط آیتم‌های بازه‌های شلوغ بین دو همسایه سالمشان پخش می‌شوند
+
+    کلید بقیه آیتم‌ها دست نمی‌خورد؛ اگر بین همسایه‌ها جای کافی نباشد کل مجموعه
+    با rebalance شماره‌گذاری می‌شود.
+
+    Returns:
+        list: شناسه ردیف‌های تغییر کرده
+    """
+    model = queryset.model
+    rows = list(queryset.order_by('displayOrder', 'id').values_list('id', 'displayOrder'))
+    keys = [key for _, key in rows]
+
+    new_keys = {}
+    for start, end in _crowded_runs(keys):
+        low = keys[start - 1] if start > 0 else None
+        high = keys[end + 1] if end + 1 < len(keys) else None
+        count = end - start + 1
+        if low is None and high is None:
+            candidates = [position * ORDER_STEP for position in range(1, count + 1)]
+        elif high is None:
+            candidates = [low + position * ORDER_STEP for position in range(1, count + 1)]
+        elif low is None:
+            candidates = [high - position * ORDER_STEP for position in range(count, 0, -1)]
+        else:
+            step = (high - low) / (count + 1)
+            if step < MIN_ORDER_GAP * 2:
+                return rebalance(queryset)
+            candidates = [low + position * step for position in range(1, count + 1)]
+        for (item_id, _), key in zip(rows[start:end + 1], candidates):
+            new_keys[item_id] = key
+
+    if new_keys:
+        now = timezone.now()
+        model.objects.bulk_update(
+            [model(id=item_id, displayOrder=key, updatedAt=now) for item_id, key in new_keys.items()],
+            ['displayOrder', 'updatedAt'], batch_size=500
+        )
+    return list(new_keys)
+
+
+def rebalance_if_needed(queryset):
+    keys = list(queryset.order_by('displayOrder', 'id').values_list('displayOrder', flat=True))
+    if needs_rebalance(keys):
+        return rebalance(queryset)
+    return []
+
+
+def move_item(queryset, item_id, prev_id=None, next_id=None):
+    """
+    جابجایی یک آیتم بین دو همسایه با نوشتن فقط همان ردیف
+
+    فقط اگر بین دو همسایه جایی نمانده باشد بازه‌های شلوغ مجموعه با spread_crowded پخش می‌شوند.
+
+    Args:
+        queryset: مجموعه‌ای که ترتیب در آن معنی دارد (مثلاً غذاهای یک رستوران)
+        prev_id / next_id: شناسه آیتم قبل و بعد از محل جدید (None برای ابتدا/انتها)
+
+    Raises:
+        DoesNotExist: اگر آیتم یا همسایه‌ها داخل مجموعه نباشند
+
+    Returns:
+        tuple: (کلید ترتیب جدید، شناسه همه ردیف‌های تغییر کرده)
+    """
+    model = queryset.model
+    ids = {item_id} | {pk for pk in (prev_id, next_id) if pk}
+    changed = set()
+
+    with transaction.atomic():
+        for attempt in range(2):
+            keys = dict(queryset.filter(id__in=ids).values_list('id', 'displayOrder'))
+            if len(keys) != len(ids):
+                raise model.DoesNotExist(f"No {model.__name__} matches the given query.")
+
+            prev_key = keys.get(prev_id) if prev_id else None
+            next_key = keys.get(next_id) if next_id else None
+            missing_key = (prev_id and prev_key is None) or (next_id and next_key is None)
+            new_key = None if missing_key else order_key_between(prev_key, next_key)
+            if new_key is not None:
+                break
+            changed.update(spread_crowded(queryset))
+        else:
+            raise ValueError("ترتیب همسایه‌ها معتبر نیست")
+
+        model.objects.filter(id=item_id).update(displayOrder=new_key, updatedAt=timezone.now())
+    changed.add(item_id)
+    return new_key, sorted(changed)
@@ -0,0 +1,202 @@
+# apps/menu/search.py
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+# ----------------------------
+# نرمال‌سازی متن فارسی/انگلیسی
+# ----------------------------
+_CHAR_MAP = str.maketrans({
+    '\u064a': '\u06cc', '\u0649': '\u06cc',  # ي ى -> ی
+    '\u0643': '\u06a9',                      # ك -> ک
+    '\u0629': '\u0647', '\u06c0': '\u0647',  # ة ۀ -> ه
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627',  # أ إ آ -> ا
+    '\u0624': '\u0648',                      # ؤ -> و
+    '\u200c': None, '\u200d': None, '\u0640': None,  # نیم‌فاصله، اتصال و کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_TOKEN_RE = re.compile(r'\w+')
+
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+TRIGRAM_THRESHOLD = 0.4
+
+
+def normalize_text(text):
+    """یکسان‌سازی حروف عربی/فارسی، حذف اعراب و نیم‌فاصله و تبدیل ارقام"""
+    text = _DIACRITICS_RE.sub('', (text or '').translate(_CHAR_MAP))
+    return text.lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def tokenize_document(text):
+    """توکن‌های متن غذا؛ کلمات نیم‌فاصله‌دار هم به صورت چسبیده و هم جدا ایندکس می‌شوند"""
+    text = text or ''
+    tokens = tokenize(text)
+    if '\u200c' in text:
+        tokens += tokenize(text.replace('\u200c', ' '))
+    return tokens
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ----------------------------
+# ایندکس معکوس غذاهای یک رستوران
+# ----------------------------
+class FoodSearchIndex:
+    """
+    ایندکس معکوس غذاهای یک رستوران با جستجوی کامل، پیشوندی و سه‌حرفی (trigram)
+
+    ایندکس بعد از ساخته شدن تغییر نمی‌کند تا بین threadها بدون قفل خوانده شود؛
+    با تغییر منو rebuilt یک ایندکس جدید می‌سازد و فقط غذاهای تغییر کرده دوباره
+    توکن‌سازی می‌شوند.
+    """
+
+    def __init__(self, foods=(), version=None, previous=None):
+        self.version = version
+        self.documents = {}   # food_id -> (fingerprint, {token: weight})
+        self.order = {}       # food_id -> ترتیب نمایش در منو
+        self.postings = {}    # token -> {food_id: weight}
+        self.token_trigrams = {}
+        self.trigram_tokens = {}
+
+        previous_documents = previous.documents if previous else {}
+        for position, food in enumerate(foods):
+            food_id = food['id']
+            self.order[food_id] = position
+            fingerprint = (food['search_title'], food['search_description'])
+            current = previous_documents.get(food_id)
+            if current and current[0] == fingerprint:
+                # توکن‌های غذای بدون تغییر فقط خوانده می‌شوند و بین دو ایندکس مشترک هستند
+                tokens = current[1]
+            else:
+                tokens = {}
+                for token in tokenize_document(food['search_description']):
+                    tokens[token] = DESCRIPTION_WEIGHT
+                for token in tokenize_document(food['search_title']):
+                    tokens[token] = TITLE_WEIGHT
+            self.documents[food_id] = (fingerprint, tokens)
+            self._add_posting(food_id, tokens)
+
+        self.sorted_tokens = sorted(self.postings)
+
+    def _add_posting(self, food_id, tokens):
+        for token, weight in tokens.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                grams = trigrams(token)
+                self.token_trigrams[token] = grams
+                for gram in grams:
+                    self.trigram_tokens.setdefault(gram, set()).add(token)
+            self.postings[token][food_id] = weight
+
+    def rebuilt(self, foods, version):
+        """ایندکس جدید برای نسخه جدید منو (این ایندکس تغییر نمی‌کند)"""
+        return FoodSearchIndex(foods, version, previous=self)
+
+    def _match_token(self, query_token):
+        """امتیاز هر غذا برای یک کلمه جستجو"""
+        scores = {}
+
+        def add(token, factor):
+            for food_id, weight in self.postings[token].items():
+                score = weight * factor
+                if score > scores.get(food_id, 0):
+                    scores[food_id] = score
+
+        # تطابق پیشوندی (شامل تطابق کامل)
+        start = bisect_left(self.sorted_tokens, query_token)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(query_token):
+                break
+            add(token, 2.0 if token == query_token else 1.5)
+
+        # تطابق تقریبی سه‌حرفی برای غلط املایی و بخش میانی کلمه
+        if len(query_token) >= 3:
+            query_grams = trigrams(query_token)
+            candidates = {}
+            for gram in query_grams:
+                for token in self.trigram_tokens.get(gram, ()):
+                    candidates[token] = candidates.get(token, 0) + 1
+            for token, shared in candidates.items():
+                similarity = shared / len(query_grams | self.token_trigrams[token])
+                if similarity >= TRIGRAM_THRESHOLD or query_token in token:
+                    add(token, similarity)
+
+        return scores
+
+    def search(self, query, limit=None):
+        """
+        جستجو و رتبه‌بندی غذاها
+
+        Returns:
+            list: شناسه غذاها به ترتیب امتیاز (غذاهایی که همه کلمات را دارند)
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return sorted(self.documents, key=self.order.get)
+
+        total = None
+        for query_token in query_tokens:
+            scores = self._match_token(query_token)
+            if total is None:
+                total = scores
+            else:
+                total = {food_id: total[food_id] + score for food_id, score in scores.items() if food_id in total}
+            if not total:
+                return []
+
+        ranked = sorted(total, key=lambda food_id: (-total[food_id], self.order[food_id]))
+        return ranked[:limit] if limit else ranked
+
+
+# ----------------------------
+# نگهداری ایندکس‌ها در حافظه هر پروسس
+# ----------------------------
+MAX_INDEXES = 512
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_search_index(slug, snapshot):
+    """
+    ایندکس جستجوی رستوران؛ در صورت تغییر نسخه منو ایندکس جدید ساخته و جایگزین می‌شود
+
+    ایندکسی که یک thread در حال جستجو در آن است هیچ‌وقت تغییر نمی‌کند؛ فقط ارجاع
+    داخل _indexes زیر قفل عوض می‌شود.
+    """
+    version = snapshot['version']
+    with _lock:
+        index = _indexes.get(slug)
+        if index is not None:
+            _indexes.move_to_end(slug)
+            if index.version == version:
+                return index
+
+    # ساخت خارج از قفل تا جستجوی رستوران‌های دیگر منتظر نماند
+    new_index = index.rebuilt(snapshot['foods'], version) if index else FoodSearchIndex(snapshot['foods'], version)
+
+    with _lock:
+        _indexes[slug] = new_index
+        _indexes.move_to_end(slug)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return new_index
+
+
+def search_menu_foods(slug, snapshot, query, limit=None):
+    """جستجوی غذاهای منو و برگرداندن داده‌های غذا به ترتیب امتیاز"""
+    foods_by_id = {food['id']: food for food in snapshot['foods']}
+    food_ids = get_search_index(slug, snapshot).search(query, limit)
+    return [foods_by_id[food_id] for food_id in food_ids if food_id in foods_by_id]
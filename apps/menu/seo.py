@@ -0,0 +1,93 @@
+# apps/menu/seo.py
+import json
+from django.utils.html import strip_tags
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+
+# کاراکترهایی که داخل تگ <script> نباید خام بیایند
+_JSON_SCRIPT_ESCAPES = {
+    ord('>'): '\\u003E',
+    ord('<'): '\\u003C',
+    ord('&'): '\\u0026',
+}
+
+
+def _plain_text(value, length=200):
+    return Truncator(strip_tags(value or '')).chars(length)
+
+
+def _menu_item(food, lang):
+    item = {
+        '@type': 'MenuItem',
+        'name': food['title'],
+        'description': food['description'],
+        'image': food['image'] or '',
+        'offers': {
+            '@type': 'Offer',
+            'price': food['price_usd'] if lang == 'en' else str(food['price']),
+            'priceCurrency': 'USD' if lang == 'en' else 'IRR',
+        },
+    }
+    if food['preparationTime']:
+        item['prepTime'] = f"PT{food['preparationTime']}M"
+    return item
+
+
+def build_menu_structured_data(restaurant, snapshot, url, lang='fa'):
+    """
+    ساخت JSON-LD (schema.org) منوی رستوران از روی نسخه آماده منو
+
+    غذاها در یک پیمایش بر اساس دسته‌بندی گروه‌بندی می‌شوند.
+
+    Returns:
+        str: متن JSON امن برای قرار گرفتن داخل <script type="application/ld+json">
+    """
+    foods_by_category = {}
+    for food in snapshot['foods']:
+        foods_by_category.setdefault(food['category_id'], []).append(_menu_item(food, lang))
+
+    if lang == 'en':
+        name = restaurant.title_en or restaurant.title
+        description = restaurant.description_en or restaurant.description
+        address = restaurant.get_address('en')
+        menu_name = f"Digital Menu - {name}"
+    else:
+        name = restaurant.title
+        description = restaurant.description
+        address = restaurant.address
+        menu_name = f"منوی دیجیتال {name}"
+
+    if restaurant.openingTime and restaurant.closingTime:
+        opening_hours = f"{restaurant.openingTime:%H:%M}-{restaurant.closingTime:%H:%M}"
+    else:
+        opening_hours = "Mo-Su"
+
+    data = {
+        '@context': 'https://schema.org',
+        '@type': 'FoodEstablishment',
+        '@id': f"{url}#restaurant",
+        'name': name,
+        'description': _plain_text(description) or _plain_text(restaurant.text),
+        'url': url,
+        'telephone': restaurant.phone or '',
+        'address': {
+            '@type': 'PostalAddress',
+            'streetAddress': address or '',
+        },
+        'openingHours': [opening_hours],
+        'servesCuisine': [category['title'] for category in snapshot['categories']],
+        'menu': url,
+        'hasMenu': {
+            '@type': 'Menu',
+            'name': menu_name,
+            'url': url,
+            'hasMenuSection': [{
+                '@type': 'MenuSection',
+                'name': category['title'],
+                'hasMenuItem': foods_by_category.get(category['id'], []),
+            } for category in snapshot['categories']],
+        },
+    }
+
+    return mark_safe(json.dumps(data, ensure_ascii=False).translate(_JSON_SCRIPT_ESCAPES))
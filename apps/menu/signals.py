@@ -0,0 +1,113 @@
+# apps/menu/signals.py
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models.menufreemodels.models import Restaurant, MenuCategory, Food, Category, ExchangeRate
+from .cache import (
+    bump_menu_versions, bump_restaurant_menus, bump_global_menu_version, invalidate_exchange_rate,
+    invalidate_restaurant_refs, invalidate_owner_restaurants
+)
+from .categories import invalidate_category_tree
+
+
+# نسخه منو بعد از commit عوض می‌شود؛ اگر قبل از commit عوض شود درخواست همزمان
+# داده قدیمی commit شده را با نسخه جدید در کش می‌گذارد
+def _bump_on_commit(bump, *args):
+    transaction.on_commit(partial(bump, *args))
+
+
+# ----------------------------
+# Restaurant
+# ----------------------------
+@receiver(pre_save, sender=Restaurant)
+def remember_restaurant_slug(sender, instance, **kwargs):
+    """
+    نگهداری اسلاگ و مالک قبلی تا کش آدرس قدیمی و مالک قبلی هم نامعتبر شود
+
+    تاریخ انقضای قبلی هم نگه داشته می‌شود تا رویدادهای انقضا فقط با تغییر آن زمان‌بندی شوند.
+    """
+    instance._previous_slug, instance._previous_owner_id, instance._previous_expire_date = None, None, None
+    if instance.pk:
+        previous = Restaurant.objects.filter(pk=instance.pk).values_list('slug', 'owner_id', 'expireDate').first()
+        if previous:
+            instance._previous_slug, instance._previous_owner_id, instance._previous_expire_date = previous
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurant_menu(sender, instance, **kwargs):
+    slugs = [instance.slug, getattr(instance, '_previous_slug', None)]
+    owner_ids = [instance.owner_id, getattr(instance, '_previous_owner_id', None)]
+
+    def invalidate():
+        invalidate_restaurant_refs(slugs)
+        invalidate_owner_restaurants(owner_ids)
+
+    invalidate()
+    # دوباره بعد از commit تا درخواست همزمان مقدار قدیمی را در کش نگه ندارد
+    transaction.on_commit(invalidate)
+    _bump_on_commit(bump_menu_versions, slugs)
+
+
+# ----------------------------
+# MenuCategory
+# ----------------------------
+@receiver(post_save, sender=MenuCategory)
+@receiver(post_delete, sender=MenuCategory)
+def invalidate_menu_category_menu(sender, instance, **kwargs):
+    _bump_on_commit(bump_restaurant_menus, [instance.restaurant_id])
+
+
+# ----------------------------
+# Food
+# ----------------------------
+@receiver(pre_delete, sender=Food)
+def remember_food_restaurants(sender, instance, **kwargs):
+    """رابطه‌های Many-to-Many قبل از post_delete پاک می‌شوند"""
+    instance._menu_restaurant_ids = list(instance.restaurants.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Food)
+def invalidate_food_menu(sender, instance, **kwargs):
+    _bump_on_commit(bump_menu_versions, list(instance.restaurants.values_list('slug', flat=True)))
+
+
+@receiver(post_delete, sender=Food)
+def invalidate_deleted_food_menu(sender, instance, **kwargs):
+    _bump_on_commit(bump_restaurant_menus, getattr(instance, '_menu_restaurant_ids', []))
+
+
+@receiver(m2m_changed, sender=Food.restaurants.through)
+def invalidate_food_restaurants_menu(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._menu_restaurant_ids = list(instance.restaurants.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # تغییر از سمت رستوران: restaurant.foods.add(...)
+        _bump_on_commit(bump_menu_versions, [instance.slug])
+    elif action == 'post_clear':
+        _bump_on_commit(bump_restaurant_menus, getattr(instance, '_menu_restaurant_ids', []))
+    else:
+        _bump_on_commit(bump_restaurant_menus, list(pk_set or []))
+
+
+# ----------------------------
+# Category / ExchangeRate (روی منوی همه رستوران‌ها اثر دارند)
+# ----------------------------
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_all_menus(sender, instance, **kwargs):
+    _bump_on_commit(bump_global_menu_version)
+    transaction.on_commit(invalidate_category_tree)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_exchange_rate_cache(sender, instance, **kwargs):
+    """بعد از commit تا وورکر دیگری نرخ قدیمی را با نسخه جدید کش نکند"""
+    transaction.on_commit(invalidate_exchange_rate)
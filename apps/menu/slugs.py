@@ -0,0 +1,114 @@
+# apps/menu/slugs.py
+import re
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+# تعداد دفعات تلاش دوباره در صورت ثبت همزمان اسلاگ یکسان
+SLUG_SAVE_RETRIES = 5
+
+
+def make_base_slug(model, source):
+    """اسلاگ پایه از متن؛ اگر متن قابل تبدیل نباشد نام مدل استفاده می‌شود"""
+    max_length = model._meta.get_field('slug').max_length
+    # جا برای پسوند -N
+    return (slugify(source or '') or model._meta.model_name)[:max_length - 10].strip('-')
+
+
+def _taken_suffixes(model, bases, exclude_id=None):
+    """
+    اسلاگ‌های گرفته شده برای هر اسلاگ پایه با یک کوئری پیشوندی
+
+    Returns:
+        dict: اسلاگ پایه -> مجموعه پسوندهای استفاده شده (۰ یعنی خود اسلاگ پایه)
+    """
+    condition = Q()
+    for base in bases:
+        condition |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+
+    queryset = model._default_manager.filter(condition).order_by()
+    if exclude_id:
+        queryset = queryset.exclude(id=exclude_id)
+
+    patterns = {base: re.compile(rf"^{re.escape(base)}(?:-(\d+))?$") for base in bases}
+    taken = {base: set() for base in bases}
+    for slug in queryset.values_list('slug', flat=True):
+        for base, pattern in patterns.items():
+            match = pattern.match(slug)
+            if match:
+                taken[base].add(int(match.group(1) or 0))
+    return taken
+
+
+def _free_suffixes(taken):
+    """پسوندهای آزاد به ترتیب: ۰ (بدون پسوند)، ۱، ۲، ..."""
+    counter = 0
+    while True:
+        if counter not in taken:
+            yield counter
+        counter += 1
+
+
+def _with_suffix(base, counter):
+    return base if counter == 0 else f"{base}-{counter}"
+
+
+def allocate_slug(model, source, exclude_id=None):
+    """اولین اسلاگ آزاد برای متن داده شده با یک کوئری"""
+    base = make_base_slug(model, source)
+    taken = _taken_suffixes(model, [base], exclude_id)[base]
+    return _with_suffix(base, next(_free_suffixes(taken)))
+
+
+def assign_slugs(objects, source_func):
+    """
+    تخصیص اسلاگ به تعداد زیادی شیء جدید (برای bulk_create و ایمپورت)
+
+    برای همه اسلاگ‌های پایه فقط یک کوئری اجرا می‌شود و اشیاء داخل همین لیست
+    هم با هم تداخل پیدا نمی‌کنند.
+
+    Args:
+        objects: اشیاء یک مدل؛ اشیائی که اسلاگ دارند تغییر نمی‌کنند
+        source_func: تابعی که متن اسلاگ هر شیء را برمی‌گرداند
+    """
+    pending = [obj for obj in objects if not obj.slug]
+    if not pending:
+        return objects
+
+    model = type(pending[0])
+    bases = [make_base_slug(model, source_func(obj)) for obj in pending]
+    taken = _taken_suffixes(model, set(bases))
+
+    # اسلاگ‌های از پیش تعیین شده داخل همین لیست
+    for obj in objects:
+        if obj.slug:
+            for base, suffixes in taken.items():
+                match = re.match(rf"^{re.escape(base)}(?:-(\d+))?$", obj.slug)
+                if match:
+                    suffixes.add(int(match.group(1) or 0))
+
+    generators = {base: _free_suffixes(suffixes) for base, suffixes in taken.items()}
+    for obj, base in zip(pending, bases):
+        obj.slug = _with_suffix(base, next(generators[base]))
+    return objects
+
+
+def save_with_unique_slug(instance, source, save_func):
+    """
+    ذخیره شیء با اسلاگ یکتا
+
+    اگر وورکر دیگری همزمان همین اسلاگ را ثبت کرده باشد (IntegrityError)
+    اسلاگ دوباره محاسبه و ذخیره تکرار می‌شود.
+    """
+    model = type(instance)
+    for attempt in range(SLUG_SAVE_RETRIES):
+        instance.slug = allocate_slug(model, source, exclude_id=instance.pk)
+        try:
+            with transaction.atomic():
+                return save_func()
+        except IntegrityError:
+            conflict = model._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not conflict or attempt == SLUG_SAVE_RETRIES - 1:
+                instance.slug = None
+                raise
@@ -0,0 +1,223 @@
+# apps/menu/snapshot.py
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils import timezone
+from .models.menufreemodels.models import Restaurant, MenuCategory, Food, MenuSnapshot, get_current_exchange_rate
+from .cache import get_menu_version, get_menu_version_stamp
+
+
+MENU_LANGUAGES = ('fa', 'en')
+
+# با تغییر ساختار داده نسخه منو این عدد را افزایش دهید تا نسخه‌های قدیمی دوباره ساخته شوند
+MENU_SNAPSHOT_FORMAT = 4
+MENU_SNAPSHOT_KEY = 'menu:snapshot:{slug}:{lang}:{version}'
+
+# مدت نگهداری نسخه منو در کش (ثانیه)
+MENU_SNAPSHOT_CACHE_TIMEOUT = getattr(settings, 'MENU_SNAPSHOT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def normalize_lang(lang):
+    return 'en' if lang == 'en' else 'fa'
+
+
+def _file_url(field):
+    return field.url if field else None
+
+
+def get_snapshot_version(slug):
+    return f"{get_menu_version(slug)}.{MENU_SNAPSHOT_FORMAT}"
+
+
+def get_snapshot_validators(slug):
+    """
+    نسخه منو و زمان آخرین تغییر آن برای ETag/Last-Modified
+
+    فقط کلیدهای نسخه در کش خوانده می‌شوند، نه خود منو.
+    """
+    version, changed_at = get_menu_version_stamp(slug)
+    return f"{version}.{MENU_SNAPSHOT_FORMAT}", changed_at
+
+
+# ----------------------------
+# ساخت نسخه منو
+# ----------------------------
+def _serialize_category(menu_category, lang):
+    return {
+        'id': menu_category.id,
+        'title': menu_category.get_title(lang),
+        'image': _file_url(menu_category.displayImage),
+    }
+
+
+def _serialize_food(food, lang, exchange_rate):
+    data = {
+        'id': food.id,
+        'category_id': food.menuCategory_id,
+        'title': food.get_title(lang),
+        'description': food.get_description(lang),
+        'price': food.price,
+        'price_display': food.get_price_display(lang, exchange_rate),
+        'preparationTime': food.preparationTime,
+        'image': _file_url(food.image),
+        'sound': _file_url(food.sound),
+        'search_title': ' '.join(value for value in (food.title, food.title_en) if value),
+        'search_description': ' '.join(value for value in (food.description, food.description_en) if value),
+    }
+    if lang == 'en':
+        data['price_usd'] = f"{food.get_price_usd_amount(exchange_rate):.2f}"
+    return data
+
+
+def build_menu_snapshot(restaurant, version=None):
+    """
+    ساخت و ذخیره نسخه منوی رستوران برای همه زبان‌ها
+
+    Returns:
+        dict: نسخه منو به تفکیک زبان
+    """
+    if version is None:
+        version = get_snapshot_version(restaurant.slug)
+
+    menu_categories = list(MenuCategory.objects.filter(
+        restaurant=restaurant,
+        isActive=True
+    ).select_related('category'))
+
+    foods = list(Food.objects.filter(
+        restaurants=restaurant,
+        isActive=True
+    ))
+
+    exchange_rate = get_current_exchange_rate()
+
+    snapshots = {}
+    for lang in MENU_LANGUAGES:
+        data = {
+            'version': version,
+            'restaurant': {
+                'id': restaurant.id,
+                'slug': restaurant.slug,
+                'expireDate': restaurant.expireDate.isoformat() if restaurant.expireDate else None,
+            },
+            'categories': [_serialize_category(menu_category, lang) for menu_category in menu_categories],
+            'foods': [_serialize_food(food, lang, exchange_rate) for food in foods],
+        }
+        MenuSnapshot.objects.update_or_create(
+            restaurant=restaurant,
+            lang=lang,
+            defaults={'version': version, 'data': data}
+        )
+        cache.set(
+            MENU_SNAPSHOT_KEY.format(slug=restaurant.slug, lang=lang, version=version),
+            data,
+            MENU_SNAPSHOT_CACHE_TIMEOUT
+        )
+        snapshots[lang] = data
+
+    return snapshots
+
+
+# ----------------------------
+# خواندن نسخه منو
+# ----------------------------
+def get_menu_snapshot(slug, lang='fa', restaurant=None):
+    """
+    دریافت نسخه منوی رستوران بدون کوئری روی جداول منو
+
+    ترتیب جستجو: کش، جدول MenuSnapshot و در نهایت ساخت دوباره از جداول اصلی.
+
+    Raises:
+        Http404: اگر رستوران فعالی با این اسلاگ وجود نداشته باشد
+    """
+    lang = normalize_lang(lang)
+    version = get_snapshot_version(slug)
+    cache_key = MENU_SNAPSHOT_KEY.format(slug=slug, lang=lang, version=version)
+
+    data = cache.get(cache_key)
+    if data is not None:
+        return data
+
+    snapshot = MenuSnapshot.objects.filter(
+        restaurant__slug=slug,
+        restaurant__isActive=True,
+        lang=lang
+    ).only('version', 'data').first()
+
+    if snapshot and snapshot.version == version:
+        cache.set(cache_key, snapshot.data, MENU_SNAPSHOT_CACHE_TIMEOUT)
+        return snapshot.data
+
+    if restaurant is None:
+        restaurant = Restaurant.objects.filter(slug=slug, isActive=True).first()
+        if restaurant is None:
+            raise Http404("No Restaurant matches the given query.")
+
+    return build_menu_snapshot(restaurant, version)[lang]
+
+
+# ----------------------------
+# خروجی فشرده کل منو
+# ----------------------------
+# کلیدهای کوتاه خروجی فشرده و فیلد متناظر در نسخه منو
+COMPACT_FOOD_FIELDS = (
+    ('i', 'id'),
+    ('t', 'title'),
+    ('d', 'description'),
+    ('p', 'price'),
+    ('pd', 'price_display'),
+    ('u', 'price_usd'),
+    ('pt', 'preparationTime'),
+    ('im', 'image'),
+    ('s', 'sound'),
+)
+
+
+def _compact(item, fields):
+    """فیلدهای خالی حذف می‌شوند تا حجم پاسخ کمتر شود"""
+    compact = {}
+    for key, field in fields:
+        value = item.get(field)
+        if value not in (None, ''):
+            compact[key] = value
+    return compact
+
+
+def build_compact_menu(snapshot):
+    """
+    کل منو (دسته‌بندی‌ها همراه با غذاهایشان) با کلیدهای کوتاه
+
+    ساختار خروجی:
+        v: نسخه منو، x: منقضی شده
+        c: [{i: شناسه، t: عنوان، im: تصویر، f: [غذاها]}]
+        f: غذاهایی که در هیچ دسته‌بندی فعالی از منو نیستند
+        غذا: i, t, d, p (قیمت)، pd (قیمت نمایشی)، u (قیمت دلاری)، pt (زمان آماده‌سازی)، im, s (صدا)
+    """
+    foods_by_category = {}
+    for food in snapshot['foods']:
+        foods_by_category.setdefault(food['category_id'], []).append(_compact(food, COMPACT_FOOD_FIELDS))
+
+    categories = []
+    for category in snapshot['categories']:
+        compact = _compact(category, (('i', 'id'), ('t', 'title'), ('im', 'image')))
+        compact['f'] = foods_by_category.pop(category['id'], [])
+        categories.append(compact)
+
+    # غذاهای بدون دسته‌بندی یا با دسته‌بندی غیرفعال هم در صفحه منو (تب همه) نمایش داده می‌شوند
+    uncategorized = [food for foods in foods_by_category.values() for food in foods]
+
+    return {
+        'v': snapshot['version'],
+        'x': snapshot_is_expired(snapshot),
+        'c': categories,
+        'f': uncategorized,
+    }
+
+
+def snapshot_is_expired(snapshot):
+    """وضعیت انقضای رستوران بر اساس تاریخ ذخیره شده در نسخه منو"""
+    expire_date = snapshot['restaurant']['expireDate']
+    if not expire_date:
+        return False
+    return timezone.now() > datetime.fromisoformat(expire_date)
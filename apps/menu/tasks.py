@@ -0,0 +1,123 @@
+# apps/menu/tasks.py
+from celery import shared_task
+from .export import export_static_menus
+from .models.menufreemodels.models import ExchangeRate, Restaurant, Food, MenuCategory
+from .ordering import needs_rebalance, rebalance_if_needed, spread_crowded
+from .cache import bump_menu_versions
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def export_static_menus_task(force=False):
+    """
+    خروجی استاتیک منوی رستوران‌هایی که از آخرین اجرا تغییر کرده‌اند
+    """
+    try:
+        result = export_static_menus(force=force)
+        logger.info(f"خروجی استاتیک منوها: {result}")
+        return {
+            'success': True,
+            'message': f"{result['exported']} منو رندر شد",
+            **result
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در خروجی استاتیک منوها: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در خروجی استاتیک منوها: {str(e)}'
+        }
+
+
+@shared_task(bind=True)
+def update_food_usd_prices_task(self, exchange_rate_id):
+    """
+    محاسبه دوباره قیمت دلاری غذاها بعد از ثبت نرخ ارز جدید
+    """
+    try:
+        exchange_rate = ExchangeRate.objects.filter(id=exchange_rate_id, is_active=True).first()
+        if not exchange_rate:
+            return {
+                'success': True,
+                'message': 'نرخ ارز دیگر فعال نیست؛ به‌روزرسانی انجام نشد'
+            }
+
+        def report_progress(done, total):
+            self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+
+        message = exchange_rate.update_all_food_prices(progress=report_progress)
+        logger.info(message)
+        return {
+            'success': True,
+            'message': message
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در به‌روزرسانی قیمت دلاری غذاها: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در به‌روزرسانی قیمت دلاری غذاها: {str(e)}'
+        }
+
+
+def _food_ordering_needs_rebalance():
+    """
+    آیا ترتیب غذاهای منوی حداقل یک رستوران کلید تکراری یا بیش از حد نزدیک دارد؟
+
+    کلید ترتیب غذا بین رستوران‌ها مشترک است؛ همه ردیف‌ها با یک کوئری روی جدول واسط
+    خوانده می‌شوند و برای هر رستوران جداگانه بررسی می‌شوند.
+    """
+    rows = Food.restaurants.through.objects.filter(restaurant__isActive=True).order_by(
+        'restaurant_id', 'food__displayOrder', 'food_id'
+    ).values_list('restaurant_id', 'food__displayOrder')
+
+    current_restaurant, keys = None, []
+    for restaurant_id, key in rows.iterator():
+        if restaurant_id != current_restaurant:
+            if needs_rebalance(keys):
+                return True
+            current_restaurant, keys = restaurant_id, []
+        keys.append(key)
+    return needs_rebalance(keys)
+
+
+@shared_task
+def rebalance_menu_ordering_task():
+    """
+    متعادل‌سازی کلیدهای ترتیب کسری غذاها و دسته‌بندی‌های منو
+
+    دسته‌بندی‌های منو متعلق به یک رستوران هستند و برای هر رستوران جداگانه متعادل می‌شوند.
+    کلید ترتیب غذاها بین رستوران‌هایی که غذای شرکت را انتخاب کرده‌اند مشترک است، پس غذاها
+    یک بار و با حفظ ترتیب سراسری متعادل می‌شوند تا ترتیب منوی هیچ رستورانی تغییر نکند؛
+    فقط کلیدهای شلوغ بین همسایه‌هایشان پخش می‌شوند.
+    فقط نسخه منوی رستوران‌هایی که ردیفی از آنها تغییر کرده عوض می‌شود.
+    """
+    try:
+        changed_slugs = set()
+        for restaurant in Restaurant.objects.filter(isActive=True).only('id', 'slug').iterator():
+            if rebalance_if_needed(MenuCategory.objects.filter(restaurant=restaurant)):
+                changed_slugs.add(restaurant.slug)
+
+        if _food_ordering_needs_rebalance():
+            changed_food_ids = spread_crowded(Food.objects.all())
+            for start in range(0, len(changed_food_ids), 1000):
+                changed_slugs.update(Restaurant.objects.filter(
+                    foods__id__in=changed_food_ids[start:start + 1000]
+                ).values_list('slug', flat=True).distinct())
+
+        bump_menu_versions(changed_slugs)
+
+        logger.info(f"ترتیب منوی {len(changed_slugs)} رستوران متعادل شد")
+        return {
+            'success': True,
+            'message': f'ترتیب منوی {len(changed_slugs)} رستوران متعادل شد',
+            'restaurants': sorted(slug for slug in changed_slugs if slug)
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در متعادل‌سازی ترتیب منوها: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در متعادل‌سازی ترتیب منوها: {str(e)}'
+        }
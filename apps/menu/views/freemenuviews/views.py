@@ -1,16 +1,106 @@
 from django.shortcuts import render, get_object_or_404,redirect
-from django.http import HttpResponse
-from ...models.menufreemodels.models import Restaurant, MenuCategory, Food, get_current_exchange_rate
+from django.http import HttpResponse, Http404
+from ...models.menufreemodels.models import Restaurant
 from django.http import JsonResponse
 from django.urls import reverse
+from ...cache import (
+    get_menu_version, menu_page_cache_key, is_menu_page_cacheable, get_menu_page_timeout,
+    resolve_restaurant, restaurant_ref_is_expired
+)
+from ...snapshot import get_menu_snapshot, get_snapshot_validators, snapshot_is_expired, build_compact_menu
+from ...seo import build_menu_structured_data
+from ...search import search_menu_foods
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from django.views.decorators.cache import cache_control
+
+
+# ----------------------------
+# درخواست شرطی (ETag / Last-Modified)
+# ----------------------------
+def _request_restaurant_ref(restaurant_slug):
+    """اطلاعات پایه رستوران فعال از کش؛ در غیر این صورت 404"""
+    ref = resolve_restaurant(restaurant_slug)
+    if ref is None or not ref.isActive:
+        raise Http404("No Restaurant matches the given query.")
+    return ref
+
+
+def _request_snapshot(request, restaurant_slug):
+    """نسخه منو یک بار برای هر درخواست خوانده می‌شود"""
+    if not hasattr(request, '_menu_snapshot'):
+        _request_restaurant_ref(restaurant_slug)
+        request._menu_snapshot = get_menu_snapshot(restaurant_slug, request.GET.get('lang', 'fa'))
+    return request._menu_snapshot
+
+
+def _request_validators(request, restaurant_slug):
+    """
+    ETag و Last-Modified از روی نسخه منو (بدون خواندن خود منو)
+
+    نسخه با هر تغییر منو، حذف غذا یا تغییر نرخ ارز عوض می‌شود و زمان آن زمان آخرین تغییر است؛
+    برای رستوران منقضی شده زمان انقضا هم لحاظ می‌شود.
+    """
+    if not hasattr(request, '_menu_validators'):
+        ref = _request_restaurant_ref(restaurant_slug)
+        version, last_modified = get_snapshot_validators(restaurant_slug)
+        expired = restaurant_ref_is_expired(ref)
+        if expired:
+            last_modified = max(last_modified, ref.expireDate)
+        request._menu_validators = (f"{version}.{int(expired)}", last_modified)
+    return request._menu_validators
+
+
+def menu_etag(request, restaurant_slug, *args, **kwargs):
+    return _request_validators(request, restaurant_slug)[0]
+
+
+def menu_last_modified(request, restaurant_slug, *args, **kwargs):
+    return _request_validators(request, restaurant_slug)[1]
+
+
+def render_menu_page(request, restaurant, snapshot, lang):
+    """رندر صفحه منوی دیجیتال از روی نسخه آماده منو"""
+    context = {
+        'restaurant': restaurant,
+        'menu_categories': snapshot['categories'],
+        'foods': snapshot['foods'],
+        'current_language': lang,
+        'lang': lang,
+        'expired': False  # فلگ منقضی نشده
+    }
+
+    # داده ساختاریافته schema.org فقط برای رستوران‌های سئو شده
+    if restaurant.isSeo:
+        context['structured_data'] = build_menu_structured_data(
+            restaurant, snapshot, request.build_absolute_uri(), lang
+        )
+
+    if lang == 'en':
+        return render(request, 'menu_app/free/restaurant_en.html', context)
+    else:
+        return render(request, 'menu_app/free/restaurant.html', context)
+
 
 # صفحه اصلی منوی دیجیتال
+@cache_control(no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
 def digital_menu(request, restaurant_slug):
     """صفحه اصلی منوی دیجیتال"""
-    restaurant = get_object_or_404(Restaurant, slug=restaurant_slug, isActive=True)
+    # کش صفحه رندر شده بر اساس رستوران، زبان و نسخه منو
+    page_cache_key = None
+    if is_menu_page_cacheable(request):
+        version = get_menu_version(restaurant_slug)
+        page_cache_key = menu_page_cache_key(request, restaurant_slug, request.GET.get('lang', 'fa'), version)
+        content = cache.get(page_cache_key)
+        if content is not None:
+            return HttpResponse(content)
+
+    ref = _request_restaurant_ref(restaurant_slug)
+    restaurant = get_object_or_404(Restaurant, pk=ref.id, isActive=True)
 
     # بررسی انقضای رستوران - فقط is_expired
-    if restaurant.is_expired:
+    if restaurant_ref_is_expired(ref):
         lang = request.GET.get('lang', 'fa')
         context = {
             'restaurant': restaurant,
@@ -24,99 +114,81 @@ def digital_menu(request, restaurant_slug):
         else:
             return render(request, 'menu_app/free/restaurant_expired.html', context)
 
-    # اگر منقضی نشده، دیتا رو آماده کن
+    # اگر منقضی نشده، دیتا رو از نسخه آماده منو بخوان
     lang = request.GET.get('lang', 'fa')
 
-    menu_categories = MenuCategory.objects.filter(
-        restaurant=restaurant,
-        isActive=True
-    ).select_related('category').prefetch_related('foods')
+    snapshot = _request_snapshot(request, restaurant_slug)
+    response = render_menu_page(request, restaurant, snapshot, lang)
 
-    foods = Food.objects.filter(
-        restaurants=restaurant,
-        isActive=True
-    ).select_related('menuCategory__category').distinct()
+    if page_cache_key:
+        timeout = get_menu_page_timeout(restaurant.expireDate)
+        if timeout:
+            cache.set(page_cache_key, response.content, timeout)
 
-    exchange_rate = get_current_exchange_rate()
+    return response
 
-    context = {
-        'restaurant': restaurant,
-        'menu_categories': menu_categories,
-        'foods': foods,
-        'current_language': lang,
-        'exchange_rate': exchange_rate,
-        'lang': lang,
-        'expired': False  # فلگ منقضی نشده
-    }
 
-    if lang == 'en':
-        return render(request, 'menu_app/free/restaurant_en.html', context)
-    else:
-        return render(request, 'menu_app/free/restaurant.html', context)
+def serialize_foods(foods):
+    """خروجی API غذاها از روی نسخه منو"""
+    return [{
+        'id': food['id'],
+        'title': food['title'],
+        'description': food['description'],
+        'price': food['price'],
+        'price_display': food['price_display'],
+        'preparationTime': food['preparationTime'],
+        'image': food['image'],
+        'sound': food['sound'],
+        'category_id': food['category_id']
+    } for food in foods]
+
 
+@cache_control(no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
 def get_foods_by_category(request, restaurant_slug, category_id):
     """دریافت غذاها بر اساس دسته‌بندی (API)"""
-    restaurant = get_object_or_404(Restaurant, slug=restaurant_slug, isActive=True)
-    lang = request.GET.get('lang', 'fa')
+    snapshot = _request_snapshot(request, restaurant_slug)
 
-    if category_id == 'all':
-        foods = Food.objects.filter(restaurants=restaurant, isActive=True)
-    else:
-        menu_category = get_object_or_404(MenuCategory, id=category_id, restaurant=restaurant, isActive=True)
-        foods = Food.objects.filter(menuCategory=menu_category, restaurants=restaurant, isActive=True)
+    foods = snapshot['foods']
+    if category_id != 'all':
+        if not any(str(category['id']) == category_id for category in snapshot['categories']):
+            raise Http404("No MenuCategory matches the given query.")
+        foods = [food for food in foods if str(food['category_id']) == category_id]
 
-    foods_data = []
-    for food in foods.distinct():
-        foods_data.append({
-            'id': food.id,
-            'title': food.title_en if lang == 'en' and food.title_en else food.title,
-            'description': food.description_en if lang == 'en' and food.description_en else food.description,
-            'price': food.price,
-            'price_display': food.get_price_display(lang),
-            'preparationTime': food.preparationTime,
-            'image': food.image.url if food.image else None,
-            'sound': food.sound.url if food.sound else None,
-            'category_id': food.menuCategory.id if food.menuCategory else None
-        })
-
-    return JsonResponse({'foods': foods_data})
+    return JsonResponse({
+        'foods': serialize_foods(foods),
+        'expired': snapshot_is_expired(snapshot)
+    })
 
 
 
+@cache_control(no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
 def search_foods(request, restaurant_slug):
     """جستجوی غذاها (API)"""
-    restaurant = get_object_or_404(Restaurant, slug=restaurant_slug, isActive=True)
     query = request.GET.get('q', '').strip()
-    lang = request.GET.get('lang', 'fa')
-
-    base_qs = Food.objects.filter(restaurants=restaurant, isActive=True)
+    snapshot = _request_snapshot(request, restaurant_slug)
 
+    foods = snapshot['foods']
     if query:
-        foods = base_qs.filter(
-            Q(title__icontains=query) |
-            Q(title_en__icontains=query) |
-            Q(description__icontains=query) |
-            Q(description_en__icontains=query)
-        )
-    else:
-        foods = base_qs
-
-    foods_data = []
-    for food in foods.distinct():
-        foods_data.append({
-            'id': food.id,
-            'title': food.title_en if lang == 'en' and food.title_en else food.title,
-            'description': food.description_en if lang == 'en' and food.description_en else food.description,
-            'price': food.price,
-            'price_display': food.get_price_display(lang),
-            'preparationTime': food.preparationTime,
-            'image': food.image.url if food.image else None,
-            'sound': food.sound.url if food.sound else None,
-            'category_id': food.menuCategory.id if food.menuCategory else None
-        })
-
-    return JsonResponse({'foods': foods_data})
+        foods = search_menu_foods(restaurant_slug, snapshot, query)
+
+    return JsonResponse({
+        'foods': serialize_foods(foods),
+        'expired': snapshot_is_expired(snapshot)
+    })
+
+
 
+@cache_control(no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
+def menu_json(request, restaurant_slug):
+    """کل منو به صورت گروه‌بندی شده در یک درخواست (API)"""
+    snapshot = _request_snapshot(request, restaurant_slug)
+    return JsonResponse(
+        build_compact_menu(snapshot),
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
 
 
 def change_language(request, restaurant_slug):
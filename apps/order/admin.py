@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ordermenu, MenuImage
+from .models import Ordermenu, MenuImage, OrderDailyStat, NotificationOutbox, TaskFence
 
 
 @admin.register(Ordermenu)
@@ -57,3 +57,28 @@ class MenuImageAdmin(admin.ModelAdmin):
     preview_image.allow_tags = True
     preview_image.short_description = "پیش‌نمایش عکس"
 
+
+
+@admin.register(OrderDailyStat)
+class OrderDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'restaurant', 'owner', 'order_count', 'paid_count', 'revenue',
+                    'payment_success_count', 'payment_failure_count')
+    list_filter = ('date',)
+    date_hierarchy = 'date'
+    ordering = ('-date',)
+    readonly_fields = [field.name for field in OrderDailyStat._meta.fields]
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'recipient', 'restaurant', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('recipient', 'dedupe_key')
+    ordering = ('-created_at',)
+    readonly_fields = ('dedupe_key', 'attempts', 'claimed_at', 'sent_at', 'last_error', 'created_at')
+
+
+@admin.register(TaskFence)
+class TaskFenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'token', 'updated_at')
+    readonly_fields = ('name', 'token', 'updated_at')
@@ -0,0 +1,107 @@
+# apps/order/expiry.py
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+# رویدادهای انقضای رستوران: (نام رویداد، فاصله تا انقضا، مهلت اجرای دیرهنگام تا انقضا)
+# اگر زمان رویداد گذشته باشد ولی مهلت آن نه، رویداد همان لحظه اجرا می‌شود
+EVENT_REMINDER = 'reminder'
+EVENT_RENEWAL_ORDER = 'renewal_order'
+EVENT_DEACTIVATE = 'deactivate'
+
+EXPIRY_EVENTS = (
+    (EVENT_REMINDER, timedelta(days=7), timedelta(days=3)),
+    (EVENT_RENEWAL_ORDER, timedelta(days=4), timedelta(0)),
+    (EVENT_DEACTIVATE, timedelta(0), None),
+)
+
+# فاصله اجرای sweep و بازه‌ای که رویدادهای آن از قبل در صف قرار می‌گیرند (ثانیه)
+# ETA بیشتر از visibility_timeout در Redis باعث تحویل دوباره تسک می‌شود؛ پس رویدادهای دورتر
+# را sweep بعدی در صف می‌گذارد
+EXPIRY_SWEEP_INTERVAL = getattr(settings, 'EXPIRY_SWEEP_INTERVAL', 60 * 60)
+
+EXPIRY_EVENT_KEY = 'order:expiry_event:{restaurant_id}:{event}:{expire_ts}'
+
+
+def expire_timestamp(expire_date):
+    return int(expire_date.timestamp())
+
+
+def get_due_events(expire_date, now=None, horizon=None):
+    """
+    رویدادهای انقضایی که تا پایان بازه horizon سررسید می‌شوند
+
+    Returns:
+        list: (رویداد، زمان اجرا)؛ برای رویدادهای عقب افتاده زمان اجرا همین لحظه است
+    """
+    if not expire_date:
+        return []
+    now = now or timezone.now()
+    horizon = now + timedelta(seconds=EXPIRY_SWEEP_INTERVAL if horizon is None else horizon)
+
+    events = []
+    for event, before, deadline in EXPIRY_EVENTS:
+        eta = expire_date - before
+        if eta >= horizon:
+            continue
+        if eta < now:
+            if deadline is not None and now >= expire_date - deadline:
+                continue
+            eta = now
+        events.append((event, eta))
+    return events
+
+
+def schedule_expiry_events(restaurant_id, expire_date, now=None):
+    """
+    قرار دادن رویدادهای سررسید شده یک رستوران در صف Celery با ETA
+
+    هر رویداد برای هر تاریخ انقضا فقط یک بار در صف قرار می‌گیرد (cache.add)، پس فراخوانی
+    همزمان از سیگنال و sweep تسک تکراری نمی‌سازد. تسک قبل از اجرا دوباره تاریخ انقضا را
+    بررسی می‌کند؛ رویدادهای تاریخ انقضای قدیمی بی‌اثر می‌شوند.
+
+    Returns:
+        list: نام رویدادهای در صف قرار گرفته
+    """
+    from .tasks import handle_restaurant_expiry_event
+
+    now = now or timezone.now()
+    expire_ts = expire_timestamp(expire_date)
+    scheduled = []
+    for event, eta in get_due_events(expire_date, now):
+        key = EXPIRY_EVENT_KEY.format(restaurant_id=restaurant_id, event=event, expire_ts=expire_ts)
+        # کلید تا کمی بعد از اجرای رویداد نگه داشته می‌شود
+        timeout = int((eta - now).total_seconds()) + 2 * EXPIRY_SWEEP_INTERVAL
+        if not cache.add(key, 1, timeout):
+            continue
+        handle_restaurant_expiry_event.apply_async(args=(restaurant_id, event, expire_ts), eta=eta)
+        scheduled.append(event)
+    return scheduled
+
+
+def schedule_upcoming_expiry_events(now=None):
+    """
+    در صف قرار دادن رویدادهای همه رستوران‌هایی که تا sweep بعدی سررسید می‌شوند
+
+    برای هر رویداد فقط رستوران‌هایی که تاریخ انقضای آنها در بازه مربوط است خوانده می‌شوند
+    (بازه با یک دوره همپوشانی دارد تا اجرای دیرهنگام sweep رویدادی را جا نیندازد).
+
+    Returns:
+        int: تعداد رویدادهای در صف قرار گرفته
+    """
+    from apps.menu.models.menufreemodels.models import Restaurant
+
+    now = now or timezone.now()
+    interval = timedelta(seconds=EXPIRY_SWEEP_INTERVAL)
+    scheduled = 0
+    for event, before, deadline in EXPIRY_EVENTS:
+        restaurants = Restaurant.objects.filter(
+            isActive=True,
+            expireDate__gte=now + before - interval,
+            expireDate__lt=now + before + interval,
+        ).values_list('id', 'expireDate')
+        for restaurant_id, expire_date in restaurants:
+            scheduled += len(schedule_expiry_events(restaurant_id, expire_date, now))
+    return scheduled
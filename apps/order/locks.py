@@ -0,0 +1,220 @@
+# apps/order/locks.py
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+
+
+TASK_LOCK_KEY = 'order:lock:{name}'
+TASK_LOCK_FENCE_KEY = 'order:lock:{name}:fence'
+
+# مدت اجاره قفل (ثانیه)؛ اگر وورکر بمیرد قفل بعد از این مدت خودبه‌خود آزاد می‌شود
+TASK_LOCK_LEASE = getattr(settings, 'TASK_LOCK_LEASE', 15 * 60)
+
+# مقایسه و حذف/تمدید اتمیک در Redis (فقط اگر قفل هنوز token همین نمونه را داشته باشد)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# برای کش‌های غیر Redis (locmem در توسعه) که فقط داخل یک پروسس مشترک هستند
+_local_cache_lock = threading.Lock()
+
+_local = threading.local()
+
+
+class LockLost(Exception):
+    """اجاره قفل تمام شده و نمونه دیگری قفل را گرفته است"""
+
+
+def _compare_and_run(key, token, script, fallback, *args):
+    """
+    اجرای اتمیک script روی کلید فقط اگر مقدار آن برابر token باشد
+
+    Returns:
+        bool: True اگر کلید هنوز token را داشت
+    """
+    if isinstance(cache, RedisCache):
+        redis_key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(redis_key, write=True)
+        return bool(client.eval(script, 1, redis_key, str(token), *args))
+
+    with _local_cache_lock:
+        if cache.get(key) != token:
+            return False
+        fallback()
+        return True
+
+
+class TaskLock:
+    """
+    قفل توزیع شده روی کش مشترک با مدت اجاره و fencing token
+
+    گرفتن قفل با cache.add انجام می‌شود (اتمیک در Redis) و هر بار گرفتن قفل یک شماره
+    افزایشی (fencing token) از cache.incr می‌گیرد که در جدول TaskFence هم ثبت می‌شود.
+    نوشتن‌های محافظت شده داخل تراکنش خود check() را صدا می‌زنند: ردیف TaskFence قفل
+    (FOR UPDATE) و token مقایسه می‌شود، پس نمونه‌ای که اجاره‌اش تمام شده و نمونه جدیدتر
+    token بزرگتری ثبت کرده نمی‌تواند چیزی commit کند.
+    """
+
+    def __init__(self, name, lease=None):
+        self.name = name
+        self.lease = lease or TASK_LOCK_LEASE
+        self.key = TASK_LOCK_KEY.format(name=name)
+        self.fence_key = TASK_LOCK_FENCE_KEY.format(name=name)
+        self.token = None
+
+    def _seed_counter(self):
+        """
+        مقداردهی شمارنده کش از آخرین token ثبت شده در TaskFence (اگر شمارنده وجود نداشته باشد)
+
+        بعد از پاک شدن کش یا راه‌اندازی دوباره Redis شمارنده از صفر شروع نمی‌شود.
+        """
+        from .models import TaskFence
+
+        if cache.get(self.fence_key) is None:
+            stored = TaskFence.objects.filter(name=self.name).values_list('token', flat=True).first()
+            cache.add(self.fence_key, stored or 0, None)
+
+    def _next_token(self):
+        self._seed_counter()
+        try:
+            return cache.incr(self.fence_key)
+        except ValueError:
+            # کلید بین add و incr حذف شده است
+            self._seed_counter()
+            return cache.incr(self.fence_key)
+
+    def _register_token(self, token):
+        """
+        ثبت token در TaskFence؛ فقط tokenهای بزرگتر از آخرین token ثبت شده پذیرفته می‌شوند
+
+        اگر نمونه قبلی هنوز داخل تراکنش محافظت شده باشد این UPDATE تا commit آن صبر می‌کند.
+        """
+        from .models import TaskFence
+
+        if TaskFence.objects.filter(name=self.name, token__lt=token).update(token=token):
+            return True
+        _, created = TaskFence.objects.get_or_create(name=self.name, defaults={'token': token})
+        if created:
+            return True
+        if TaskFence.objects.filter(name=self.name, token__lt=token).update(token=token):
+            return True
+        # شمارنده کش از آخرین token ثبت شده عقب است (مثلاً کش جداگانه هر پروسس)
+        stored = TaskFence.objects.filter(name=self.name).values_list('token', flat=True).first()
+        cache.set(self.fence_key, max(stored or 0, token), None)
+        return False
+
+    def acquire(self):
+        # اگر token از TaskFence عقب باشد شمارنده همگام و یک بار دیگر تلاش می‌شود
+        for _ in range(2):
+            token = self._next_token()
+            if not cache.add(self.key, token, self.lease):
+                return False
+            self.token = token
+            if self._register_token(token):
+                return True
+            self.release()
+        return False
+
+    def renew(self):
+        """تمدید اجاره فقط اگر قفل هنوز متعلق به همین نمونه باشد"""
+        if self.token is None:
+            return False
+        return _compare_and_run(
+            self.key, self.token, _RENEW_SCRIPT,
+            lambda: cache.touch(self.key, self.lease),
+            int(self.lease * 1000)
+        )
+
+    def check(self):
+        """
+        بررسی fencing token و تمدید اجاره؛ داخل تراکنش نوشتن محافظت شده صدا زده شود
+
+        ردیف TaskFence تا پایان تراکنش بیرونی قفل می‌ماند، پس نمونه جدیدتر تا commit
+        این تراکنش نمی‌تواند token خود را ثبت کند و شروع به کار کند.
+
+        Raises:
+            LockLost: اگر اجاره تمام شده یا نمونه دیگری قفل را گرفته باشد
+        """
+        from .models import TaskFence
+
+        if not self.renew():
+            raise LockLost(f"قفل {self.name} (token {self.token}) دیگر معتبر نیست")
+        with transaction.atomic():
+            if not TaskFence.objects.select_for_update().filter(name=self.name, token=self.token).exists():
+                raise LockLost(f"token {self.token} قفل {self.name} جایگزین شده است")
+
+    def release(self):
+        # فقط قفل خود این نمونه آزاد می‌شود، نه قفلی که بعد از پایان اجاره دیگری گرفته
+        if self.token is not None:
+            _compare_and_run(self.key, self.token, _RELEASE_SCRIPT, lambda: cache.delete(self.key))
+        self.token = None
+
+
+@contextmanager
+def task_lock(name, lease=None):
+    """
+    اجرای یک بلوک فقط در یک نمونه
+
+    Yields:
+        TaskLock | None: None اگر نمونه دیگری قفل را در اختیار داشته باشد
+    """
+    lock = TaskLock(name, lease)
+    if not lock.acquire():
+        yield None
+        return
+
+    previous = getattr(_local, 'lock', None)
+    _local.lock = lock
+    try:
+        yield lock
+    finally:
+        _local.lock = previous
+        lock.release()
+
+
+def check_task_lock():
+    """
+    بررسی fencing token تسک جاری (اگر تسک با single_instance_task اجرا شده باشد)
+
+    برای محافظت از نوشتن باید داخل همان transaction.atomic نوشتن صدا زده شود.
+    """
+    lock = getattr(_local, 'lock', None)
+    if lock is not None:
+        lock.check()
+
+
+def single_instance_task(name=None, lease=None):
+    """
+    دکوراتور تسک‌های دوره‌ای تا در هر لحظه فقط یک نمونه از آنها اجرا شود
+
+    اگر نمونه دیگری در حال اجرا باشد تسک بدون کار برمی‌گردد.
+    زیر @shared_task قرار می‌گیرد.
+    """
+    def decorator(func):
+        lock_name = name or f"{func.__module__}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with task_lock(lock_name, lease) as lock:
+                if lock is None:
+                    return {
+                        'success': True,
+                        'message': f'{lock_name} در حال اجرا توسط نمونه دیگری است',
+                        'skipped': True
+                    }
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,22 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.order.models import OrderDailyStat
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the OrderDailyStat rollup (full history by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Only rebuild the last N days')
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options['days'] is not None:
+            start_date = timezone.now().date() - timedelta(days=options['days'])
+        started_at = timezone.now()
+        row_count = OrderDailyStat.refresh(start_date)
+        if start_date is None:
+            # فقط ساخت کامل همه روزها را پوشش می‌دهد
+            OrderDailyStat.mark_refreshed(started_at)
+        self.stdout.write(self.style.SUCCESS(f"{row_count} daily stat rows rebuilt"))
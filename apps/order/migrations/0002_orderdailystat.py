@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_menusnapshot'),
+        ('order', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='تاریخ')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='تعداد سفارشات')),
+                ('unpaid_count', models.PositiveIntegerField(default=0, verbose_name='پرداخت نشده')),
+                ('paid_count', models.PositiveIntegerField(default=0, verbose_name='پرداخت شده')),
+                ('confirmed_count', models.PositiveIntegerField(default=0, verbose_name='تایید شده')),
+                ('delivered_count', models.PositiveIntegerField(default=0, verbose_name='تحویل شده')),
+                ('renewal_count', models.PositiveIntegerField(default=0, verbose_name='تمدید شده')),
+                ('notrenewed_count', models.PositiveIntegerField(default=0, verbose_name='تمدید نشده')),
+                ('revenue', models.PositiveBigIntegerField(default=0, verbose_name='درآمد (ریال)')),
+                ('payment_success_count', models.PositiveIntegerField(default=0, verbose_name='پرداخت موفق')),
+                ('payment_failure_count', models.PositiveIntegerField(default=0, verbose_name='پرداخت ناموفق')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'آمار روزانه سفارشات',
+                'verbose_name_plural': 'آمار روزانه سفارشات',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ordermenu',
+            index=models.Index(fields=['created_at'], name='ordermenu_created_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='orderdailystat',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orderDailyStats', to=settings.AUTH_USER_MODEL, verbose_name='مالک'),
+        ),
+        migrations.AddField(
+            model_name='orderdailystat',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dailyStats', to='menu.restaurant', verbose_name='رستوران'),
+        ),
+        migrations.AddIndex(
+            model_name='orderdailystat',
+            index=models.Index(fields=['owner', 'date'], name='orderstat_owner_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='orderdailystat',
+            unique_together={('restaurant', 'date')},
+        ),
+    ]
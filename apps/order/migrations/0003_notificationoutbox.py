@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_category_path'),
+        ('order', '0002_orderdailystat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'ایمیل'), ('sms', 'پیامک')], max_length=10, verbose_name='کانال')),
+                ('recipient', models.CharField(max_length=255, verbose_name='گیرنده')),
+                ('subject', models.CharField(blank=True, default='', max_length=255, verbose_name='عنوان')),
+                ('body', models.TextField(verbose_name='متن')),
+                ('dedupe_key', models.CharField(max_length=255, unique=True, verbose_name='کلید یکتا')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'در انتظار ارسال'), (2, 'ارسال شده'), (3, 'ناموفق')], default=1, verbose_name='وضعیت')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان تلاش بعدی')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='آخرین خطا')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='زمان ارسال')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='کاربر')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='menu.restaurant', verbose_name='رستوران')),
+            ],
+            options={
+                'verbose_name': 'اعلان خروجی',
+                'verbose_name_plural': 'صف اعلان\u200cها',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0003_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordermenu',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ordermenu',
+            index=models.Index(fields=['updated_at'], name='ordermenu_updated_at_idx'),
+        ),
+    ]
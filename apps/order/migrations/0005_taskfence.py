@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0004_ordermenu_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskFence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='نام قفل')),
+                ('token', models.PositiveBigIntegerField(default=0, verbose_name='آخرین token')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'قفل تسک',
+                'verbose_name_plural': 'قفل\u200cهای تسک',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0005_taskfence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='زمان برداشتن'),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'در انتظار ارسال'), (2, 'ارسال شده'), (3, 'ناموفق'), (4, 'در حال ارسال')], default=1, verbose_name='وضعیت'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+# همان وضعیت‌های Ordermenu در apps/order/models.py
+STATUS_FIELDS = {
+    1: 'unpaid_count',
+    2: 'paid_count',
+    3: 'confirmed_count',
+    4: 'delivered_count',
+    5: 'renewal_count',
+    6: 'notrenewed_count',
+}
+REVENUE_STATUSES = [2, 3, 4]
+
+
+def backfill_order_daily_stats(apps, schema_editor):
+    """ساخت آمار روزانه کل تاریخچه تا داشبورد قبل از اولین اجرای تسک درست باشد"""
+    Ordermenu = apps.get_model('order', 'Ordermenu')
+    OrderDailyStat = apps.get_model('order', 'OrderDailyStat')
+    Peyment = apps.get_model('peyment', 'Peyment')
+
+    if OrderDailyStat.objects.exists():
+        return
+
+    aggregates = {
+        'order_count': models.Count('id'),
+        'revenue': models.Sum('final_price', filter=models.Q(status__in=REVENUE_STATUSES)),
+    }
+    for status, field in STATUS_FIELDS.items():
+        aggregates[field] = models.Count('id', filter=models.Q(status=status))
+
+    rows = {}
+    order_rows = Ordermenu.objects.annotate(date=TruncDate('created_at')).values(
+        'restaurant_id', 'restaurant__owner_id', 'date'
+    ).annotate(**aggregates).order_by()
+    for row in order_rows:
+        rows[(row['restaurant_id'], row['date'])] = OrderDailyStat(
+            restaurant_id=row['restaurant_id'],
+            owner_id=row['restaurant__owner_id'],
+            date=row['date'],
+            **{field: row[field] or 0 for field in aggregates}
+        )
+
+    payment_rows = Peyment.objects.annotate(date=TruncDate('createAt')).values(
+        'order__restaurant_id', 'order__restaurant__owner_id', 'date'
+    ).annotate(
+        success=models.Count('id', filter=models.Q(isFinaly=True)),
+        failure=models.Count('id', filter=models.Q(isFinaly=False, statusCode__isnull=False)),
+    ).order_by()
+    for row in payment_rows:
+        key = (row['order__restaurant_id'], row['date'])
+        if key not in rows:
+            rows[key] = OrderDailyStat(
+                restaurant_id=row['order__restaurant_id'],
+                owner_id=row['order__restaurant__owner_id'],
+                date=row['date'],
+            )
+        rows[key].payment_success_count = row['success']
+        rows[key].payment_failure_count = row['failure']
+
+    OrderDailyStat.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_notificationoutbox_claimed_at'),
+        ('peyment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_daily_stats, migrations.RunPython.noop),
+    ]
@@ -5,8 +5,11 @@ from django.utils import timezone
 
 
 # apps/order/models.py
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from apps.menu.models.menufreemodels.models import Restaurant
+from apps.user.models import CustomUser
 import utils
 from django.utils import timezone
 from decimal import Decimal
@@ -34,6 +37,8 @@ class Ordermenu(models.Model):
     imageFile = utils.FileUpload('images', 'ordermenu')
     image = models.ImageField(upload_to=imageFile.upload_to, verbose_name='عکس', blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
+    # برای پیدا کردن روزهایی که آمار آنها باید دوباره ساخته شود
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
     # ✅ وضعیت سفارش
     status = models.PositiveSmallIntegerField(
@@ -52,11 +57,15 @@ class Ordermenu(models.Model):
 
     def save(self, *args, **kwargs):
         # محاسبه قیمت نهایی قبل از ذخیره
+        self.calculate_final_price()
+        super().save(*args, **kwargs)
+
+    def calculate_final_price(self):
+        """قیمت نهایی؛ برای bulk_create که save را صدا نمی‌زند هم استفاده می‌شود"""
         self.final_price = self.base_price
         if self.is_seo_enabled:
             self.final_price += self.seo_extra_price
-
-        super().save(*args, **kwargs)
+        return self.final_price
 
     def get_fixed_price(self):
         """تابع برای بازگرداندن مبلغ نهایی"""
@@ -79,6 +88,66 @@ class Ordermenu(models.Model):
         """تابع برای دسترسی به choicesهای وضعیت"""
         return cls.STATUS_CHOICES
 
+    # وضعیت‌هایی که در درآمد حساب می‌شوند
+    REVENUE_STATUSES = [STATUS_PAID, STATUS_CONFIRMED, STATUS_DELIVERED]
+
+    @classmethod
+    def get_dashboard_stats(cls, owner):
+        """
+        آمار داشبورد مالک رستوران
+
+        روزهای گذشته از جدول تجمیعی OrderDailyStat خوانده می‌شوند؛ امروز و روزهایی که
+        سفارشی از آنها بعد از آخرین ساخت جدول تجمیعی تغییر کرده یا ثبت شده با یک کوئری
+        تجمیع شرطی روی همان سفارشات شمرده می‌شوند. اگر زمان آخرین ساخت معلوم نباشد
+        (کش پاک شده) همه سفارشات مستقیم شمرده می‌شوند.
+
+        Returns:
+            dict: تعداد سفارشات به تفکیک وضعیت، امروز و این ماه و درآمد (ریال)
+        """
+        today = timezone.now().date()
+        month_start = today.replace(day=1)
+        revenue_q = models.Q(status__in=cls.REVENUE_STATUSES)
+
+        orders = cls.objects.filter(restaurant__owner=owner)
+        last_refresh = OrderDailyStat.last_refresh()
+        if last_refresh is None:
+            live_orders, past_days = orders, OrderDailyStat.objects.none()
+        else:
+            changed_dates = set(orders.filter(
+                updated_at__gte=last_refresh, created_at__date__lt=today
+            ).annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct().order_by())
+            live_orders = orders.filter(
+                models.Q(created_at__date=today) | models.Q(created_at__date__in=changed_dates)
+            )
+            past_days = OrderDailyStat.objects.filter(owner=owner, date__lt=today).exclude(date__in=changed_dates)
+
+        today_q = models.Q(created_at__date=today)
+        month_q = models.Q(created_at__date__gte=month_start)
+        live_stats = live_orders.aggregate(
+            paid_count=models.Count('id', filter=models.Q(status=cls.STATUS_PAID)),
+            confirmed_count=models.Count('id', filter=models.Q(status=cls.STATUS_CONFIRMED)),
+            delivered_count=models.Count('id', filter=models.Q(status=cls.STATUS_DELIVERED)),
+            unpaid_count=models.Count('id', filter=models.Q(status=cls.STATUS_UNPAID)),
+            today_count=models.Count('id', filter=today_q),
+            today_revenue=models.Sum('final_price', filter=revenue_q & today_q),
+            monthly_count=models.Count('id', filter=month_q),
+            monthly_revenue=models.Sum('final_price', filter=revenue_q & month_q),
+        )
+
+        past_stats = past_days.aggregate(
+            paid_count=models.Sum('paid_count'),
+            confirmed_count=models.Sum('confirmed_count'),
+            delivered_count=models.Sum('delivered_count'),
+            unpaid_count=models.Sum('unpaid_count'),
+            monthly_count=models.Sum('order_count', filter=models.Q(date__gte=month_start)),
+            monthly_revenue=models.Sum('revenue', filter=models.Q(date__gte=month_start)),
+        )
+
+        stats = {key: value or 0 for key, value in live_stats.items()}
+        for key, value in past_stats.items():
+            stats[key] += value or 0
+        return stats
+
     def get_status_info(self):
         """اطلاعات کامل وضعیت سفارش"""
         status_info = {
@@ -98,6 +167,10 @@ class Ordermenu(models.Model):
     class Meta:
         verbose_name = 'سفارش منو'
         verbose_name_plural = 'سفارشات منو'
+        indexes = [
+            models.Index(fields=['created_at'], name='ordermenu_created_at_idx'),
+            models.Index(fields=['updated_at'], name='ordermenu_updated_at_idx'),
+        ]
 
 
 class MenuImage(models.Model):
@@ -114,3 +187,234 @@ class MenuImage(models.Model):
 
 
 
+
+
+class OrderDailyStat(models.Model):
+    """آمار تجمیعی روزانه سفارشات و پرداخت‌های هر رستوران (به‌روزرسانی توسط Celery)"""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='dailyStats', verbose_name='رستوران')
+    owner = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='orderDailyStats', verbose_name='مالک')
+    date = models.DateField(verbose_name='تاریخ')
+
+    order_count = models.PositiveIntegerField(default=0, verbose_name='تعداد سفارشات')
+    unpaid_count = models.PositiveIntegerField(default=0, verbose_name='پرداخت نشده')
+    paid_count = models.PositiveIntegerField(default=0, verbose_name='پرداخت شده')
+    confirmed_count = models.PositiveIntegerField(default=0, verbose_name='تایید شده')
+    delivered_count = models.PositiveIntegerField(default=0, verbose_name='تحویل شده')
+    renewal_count = models.PositiveIntegerField(default=0, verbose_name='تمدید شده')
+    notrenewed_count = models.PositiveIntegerField(default=0, verbose_name='تمدید نشده')
+    revenue = models.PositiveBigIntegerField(default=0, verbose_name='درآمد (ریال)')
+
+    payment_success_count = models.PositiveIntegerField(default=0, verbose_name='پرداخت موفق')
+    payment_failure_count = models.PositiveIntegerField(default=0, verbose_name='پرداخت ناموفق')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    STATUS_FIELDS = {
+        Ordermenu.STATUS_UNPAID: 'unpaid_count',
+        Ordermenu.STATUS_PAID: 'paid_count',
+        Ordermenu.STATUS_CONFIRMED: 'confirmed_count',
+        Ordermenu.STATUS_DELIVERED: 'delivered_count',
+        Ordermenu.STATUS_RENEWAL: 'renewal_count',
+        Ordermenu.NOTRENEWED: 'notrenewed_count',
+    }
+
+    # زمان شروع آخرین ساخت کامل/دوره‌ای جدول؛ سفارشاتی که بعد از آن تغییر کرده‌اند در
+    # داشبورد مستقیم شمرده می‌شوند
+    LAST_REFRESH_KEY = 'order:daily_stats:last_run'
+
+    @classmethod
+    def last_refresh(cls):
+        return cache.get(cls.LAST_REFRESH_KEY)
+
+    @classmethod
+    def mark_refreshed(cls, started_at):
+        """
+        ثبت زمان شروع ساخت جدول (قبل از خواندن داده‌ها) بعد از commit آن
+
+        تغییرات سفارشات بعد از started_at در اجرای بعدی و تا آن موقع در داشبورد دیده می‌شوند.
+        """
+        cache.set(cls.LAST_REFRESH_KEY, started_at, None)
+
+    @classmethod
+    def changed_dates(cls, since):
+        """
+        روزهایی که سفارش یا پرداختی از آنها بعد از since تغییر کرده است
+
+        سفارشات و پرداخت‌ها در روز ایجادشان شمرده می‌شوند؛ پرداخت شدن یا لغو یک سفارش
+        قدیمی آمار همان روز قدیمی را تغییر می‌دهد.
+        """
+        from apps.peyment.models import Peyment
+
+        order_dates = Ordermenu.objects.filter(updated_at__gte=since).annotate(
+            day=TruncDate('created_at')
+        ).values_list('day', flat=True).distinct().order_by()
+        payment_dates = Peyment.objects.filter(updateAt__gte=since).annotate(
+            day=TruncDate('createAt')
+        ).values_list('day', flat=True).distinct().order_by()
+        return set(order_dates) | set(payment_dates)
+
+    @classmethod
+    def refresh(cls, start_date=None, dates=None):
+        """
+        ساخت دوباره آمار روزانه از start_date تا امروز (None یعنی کل تاریخچه)
+
+        سفارشات و پرداخت‌ها هر کدام با یک کوئری GROUP BY (رستوران، روز) شمرده می‌شوند
+        و ردیف‌های این بازه در یک تراکنش جایگزین می‌شوند.
+
+        Args:
+            dates: روزهای دیگری (قبل از start_date) که باید دوباره ساخته شوند
+
+        Returns:
+            int: تعداد ردیف‌های ساخته شده
+        """
+        from apps.peyment.models import Peyment
+
+        orders = Ordermenu.objects.all()
+        payments = Peyment.objects.all()
+        stale = cls.objects.all()
+        if start_date:
+            dates = sorted(date for date in (dates or ()) if date < start_date)
+            orders = orders.filter(models.Q(created_at__date__gte=start_date) | models.Q(created_at__date__in=dates))
+            payments = payments.filter(models.Q(createAt__date__gte=start_date) | models.Q(createAt__date__in=dates))
+            stale = stale.filter(models.Q(date__gte=start_date) | models.Q(date__in=dates))
+
+        aggregates = {
+            'order_count': models.Count('id'),
+            'revenue': models.Sum('final_price', filter=models.Q(status__in=Ordermenu.REVENUE_STATUSES)),
+        }
+        for status, field in cls.STATUS_FIELDS.items():
+            aggregates[field] = models.Count('id', filter=models.Q(status=status))
+
+        rows = {}
+        order_rows = orders.annotate(date=TruncDate('created_at')).values(
+            'restaurant_id', 'restaurant__owner_id', 'date'
+        ).annotate(**aggregates).order_by()
+        for row in order_rows:
+            rows[(row['restaurant_id'], row['date'])] = cls(
+                restaurant_id=row['restaurant_id'],
+                owner_id=row['restaurant__owner_id'],
+                date=row['date'],
+                **{field: row[field] or 0 for field in aggregates}
+            )
+
+        payment_rows = payments.annotate(date=TruncDate('createAt')).values(
+            'order__restaurant_id', 'order__restaurant__owner_id', 'date'
+        ).annotate(
+            success=models.Count('id', filter=models.Q(isFinaly=True)),
+            failure=models.Count('id', filter=models.Q(isFinaly=False, statusCode__isnull=False)),
+        ).order_by()
+        for row in payment_rows:
+            key = (row['order__restaurant_id'], row['date'])
+            if key not in rows:
+                rows[key] = cls(
+                    restaurant_id=row['order__restaurant_id'],
+                    owner_id=row['order__restaurant__owner_id'],
+                    date=row['date'],
+                )
+            rows[key].payment_success_count = row['success']
+            rows[key].payment_failure_count = row['failure']
+
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create(rows.values(), batch_size=1000)
+
+        return len(rows)
+
+    def __str__(self):
+        return f"{self.restaurant} - {self.date}"
+
+    class Meta:
+        verbose_name = 'آمار روزانه سفارشات'
+        verbose_name_plural = 'آمار روزانه سفارشات'
+        unique_together = ['restaurant', 'date']
+        indexes = [
+            models.Index(fields=['owner', 'date'], name='orderstat_owner_date_idx'),
+        ]
+
+
+class TaskFence(models.Model):
+    """آخرین fencing token هر قفل تسک دوره‌ای (apps.order.locks)"""
+    name = models.CharField(max_length=200, unique=True, verbose_name='نام قفل')
+    token = models.PositiveBigIntegerField(default=0, verbose_name='آخرین token')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.token})"
+
+    class Meta:
+        verbose_name = 'قفل تسک'
+        verbose_name_plural = 'قفل‌های تسک'
+
+
+class NotificationOutbox(models.Model):
+    """
+    صف اعلان‌های خروجی (ایمیل/پیامک)
+
+    اعلان‌ها در تراکنش کار اصلی به صورت گروهی ثبت می‌شوند و تسک drain_notification_outbox
+    آنها را دسته‌ای از طریق sender تنظیم شده برای هر کانال ارسال می‌کند.
+    dedupe_key یکتاست تا یک اعلان (مثلاً یادآوری یک تاریخ انقضا) دو بار ثبت نشود.
+    """
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_SMS = 'sms'
+
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, 'ایمیل'),
+        (CHANNEL_SMS, 'پیامک'),
+    ]
+
+    STATUS_PENDING = 1
+    STATUS_SENT = 2
+    STATUS_FAILED = 3
+    STATUS_SENDING = 4
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'در انتظار ارسال'),
+        (STATUS_SENT, 'ارسال شده'),
+        (STATUS_FAILED, 'ناموفق'),
+        (STATUS_SENDING, 'در حال ارسال'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, verbose_name='کانال')
+    recipient = models.CharField(max_length=255, verbose_name='گیرنده')
+    owner = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications', verbose_name='کاربر')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications', verbose_name='رستوران')
+    subject = models.CharField(max_length=255, blank=True, default='', verbose_name='عنوان')
+    body = models.TextField(verbose_name='متن')
+    dedupe_key = models.CharField(max_length=255, unique=True, verbose_name='کلید یکتا')
+
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='وضعیت')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='زمان تلاش بعدی')
+    last_error = models.TextField(blank=True, default='', verbose_name='آخرین خطا')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='زمان ارسال')
+    # زمان برداشتن اعلان توسط وورکر؛ برای اعلان در حال ارسال next_attempt_at پایان مهلت آن است
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='زمان برداشتن')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def enqueue_many(cls, notifications):
+        """
+        ثبت گروهی اعلان‌ها؛ اعلان‌هایی که dedupe_key آنها قبلاً ثبت شده نادیده گرفته می‌شوند
+
+        Returns:
+            int: تعداد اعلان‌های جدید
+        """
+        notifications = {notification.dedupe_key: notification for notification in notifications}
+        if not notifications:
+            return 0
+
+        existing = set(cls.objects.filter(dedupe_key__in=notifications).values_list('dedupe_key', flat=True))
+        new_notifications = [notification for key, notification in notifications.items() if key not in existing]
+        # ignore_conflicts برای ثبت همزمان همان کلید توسط وورکر دیگر
+        cls.objects.bulk_create(new_notifications, batch_size=1000, ignore_conflicts=True)
+        return len(new_notifications)
+
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.recipient}"
+
+    class Meta:
+        verbose_name = 'اعلان خروجی'
+        verbose_name_plural = 'صف اعلان‌ها'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
@@ -0,0 +1,234 @@
+# apps/order/notifications.py
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+
+# تعداد اعلان‌های هر دسته ارسال
+NOTIFICATION_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+
+# حداکثر تعداد دسته در هر اجرای تسک تا اجرا از مدت اجاره قفل طولانی‌تر نشود
+NOTIFICATION_MAX_BATCHES = getattr(settings, 'NOTIFICATION_MAX_BATCHES', 25)
+
+# حداکثر تلاش ارسال؛ بعد از آن اعلان ناموفق علامت می‌خورد
+NOTIFICATION_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+
+# فاصله تلاش دوباره (ثانیه)؛ با هر تلاش دو برابر می‌شود
+NOTIFICATION_RETRY_DELAY = getattr(settings, 'NOTIFICATION_RETRY_DELAY', 60)
+
+# مهلت اعلان‌های برداشته شده (ثانیه)؛ اگر وورکر تا این مدت نتیجه را ثبت نکند اعلان دوباره
+# برداشته می‌شود، پس باید از زمان ارسال یک دسته (هر ارسال تا ۱۰ ثانیه) بیشتر باشد
+NOTIFICATION_CLAIM_TIMEOUT = getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 60 * 60)
+
+# حداکثر تعداد اعلان برای هر گیرنده در هر بازه (ثانیه)
+NOTIFICATION_RECIPIENT_LIMIT = getattr(settings, 'NOTIFICATION_RECIPIENT_LIMIT', 5)
+NOTIFICATION_RECIPIENT_WINDOW = getattr(settings, 'NOTIFICATION_RECIPIENT_WINDOW', 60 * 60)
+
+RECIPIENT_RATE_KEY = 'order:notify_rate:{channel}:{recipient}:{window}'
+
+
+# ----------------------------
+# فرستنده‌ها
+# ----------------------------
+class BaseSender:
+    """
+    رابط فرستنده اعلان
+
+    send در صورت خطا باید exception بدهد تا اعلان دوباره تلاش شود.
+    """
+
+    def send(self, notification):
+        raise NotImplementedError
+
+
+class ConsoleSender(BaseSender):
+    """چاپ اعلان در لاگ؛ برای توسعه و تست"""
+
+    def send(self, notification):
+        logger.info(f"[{notification.channel}] {notification.recipient}: {notification.subject} {notification.body}")
+
+
+class FileSender(BaseSender):
+    """نوشتن اعلان‌ها در فایل (هر خط یک JSON) به جای ارسال واقعی"""
+
+    def send(self, notification):
+        path = getattr(settings, 'NOTIFICATION_FILE_PATH', 'notifications.log')
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'channel': notification.channel,
+                'recipient': notification.recipient,
+                'subject': notification.subject,
+                'body': notification.body,
+                'dedupe_key': notification.dedupe_key,
+            }, ensure_ascii=False) + '\n')
+
+
+class EmailSender(BaseSender):
+    """ارسال ایمیل با تنظیمات EMAIL_* جنگو"""
+
+    def send(self, notification):
+        send_mail(notification.subject, notification.body, None, [notification.recipient])
+
+
+class SmsSender(BaseSender):
+    """ارسال پیامک از طریق درگاه HTTP تنظیم شده در SMS_GATEWAY_URL"""
+
+    def send(self, notification):
+        import requests
+
+        response = requests.post(
+            url=settings.SMS_GATEWAY_URL,
+            data=json.dumps({'receptor': notification.recipient, 'message': notification.body}),
+            headers={'content-type': 'application/json', 'Authorization': f'Bearer {settings.SMS_API_KEY}'},
+            timeout=10
+        )
+        response.raise_for_status()
+
+
+_senders = {}
+
+
+def get_sender(channel):
+    """فرستنده تنظیم شده برای کانال در NOTIFICATION_SENDERS"""
+    if channel not in _senders:
+        path = getattr(settings, 'NOTIFICATION_SENDERS', {}).get(channel, 'apps.order.notifications.ConsoleSender')
+        _senders[channel] = import_string(path)()
+    return _senders[channel]
+
+
+# ----------------------------
+# محدودیت ارسال برای هر گیرنده
+# ----------------------------
+def _take_recipient_slot(channel, recipient, now):
+    """
+    ثبت یک ارسال برای گیرنده در بازه فعلی
+
+    Returns:
+        datetime | None: None اگر ارسال مجاز باشد، وگرنه زمان شروع بازه بعد
+    """
+    window = int(now.timestamp()) // NOTIFICATION_RECIPIENT_WINDOW
+    key = RECIPIENT_RATE_KEY.format(channel=channel, recipient=recipient, window=window)
+    cache.add(key, 0, NOTIFICATION_RECIPIENT_WINDOW)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, NOTIFICATION_RECIPIENT_WINDOW)
+        count = cache.incr(key)
+
+    if count <= NOTIFICATION_RECIPIENT_LIMIT:
+        return None
+    return now + timedelta(seconds=(window + 1) * NOTIFICATION_RECIPIENT_WINDOW - now.timestamp())
+
+
+# ----------------------------
+# ارسال صف
+# ----------------------------
+def _claim_batch(batch_size, check=None):
+    """
+    برداشتن یک دسته از اعلان‌های سررسید شده در یک تراکنش
+
+    ردیف‌ها با select_for_update(skip_locked) خوانده و وضعیت «در حال ارسال» می‌گیرند، پس
+    وورکر دیگری آنها را برنمی‌دارد مگر اینکه مهلتشان (next_attempt_at) تمام شود.
+    """
+    with transaction.atomic():
+        if check:
+            check()
+        now = timezone.now()
+        notifications = list(NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+            status__in=[NotificationOutbox.STATUS_PENDING, NotificationOutbox.STATUS_SENDING],
+            next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')[:batch_size])
+        if notifications:
+            NotificationOutbox.objects.filter(id__in=[notification.id for notification in notifications]).update(
+                status=NotificationOutbox.STATUS_SENDING,
+                claimed_at=now,
+                next_attempt_at=now + timedelta(seconds=NOTIFICATION_CLAIM_TIMEOUT)
+            )
+    return notifications, now
+
+
+def _send_batch(notifications, now, check=None):
+    """
+    ارسال یک دسته برداشته شده و ثبت نتیجه با یک bulk_update
+
+    check قبل از هر ارسال (برای تمدید اجاره قفل) و داخل تراکنش ثبت نتیجه صدا زده می‌شود؛
+    اگر قفل از دست رفته باشد اعلان‌های دسته برداشته شده می‌مانند و بعد از پایان مهلت
+    دوباره ارسال می‌شوند.
+    """
+    counts = {'sent': 0, 'failed': 0, 'retried': 0, 'deferred': 0}
+    for notification in notifications:
+        notification.status = NotificationOutbox.STATUS_PENDING
+        deferred_until = _take_recipient_slot(notification.channel, notification.recipient, now)
+        if deferred_until:
+            notification.next_attempt_at = deferred_until
+            counts['deferred'] += 1
+            continue
+
+        if check:
+            check()
+        try:
+            get_sender(notification.channel).send(notification)
+        except Exception as e:
+            notification.attempts += 1
+            notification.last_error = str(e)[:1000]
+            if notification.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                notification.status = NotificationOutbox.STATUS_FAILED
+                counts['failed'] += 1
+                logger.error(f"ارسال اعلان {notification.id} به {notification.recipient} ناموفق بود: {str(e)}")
+            else:
+                delay = NOTIFICATION_RETRY_DELAY * 2 ** (notification.attempts - 1)
+                notification.next_attempt_at = now + timedelta(seconds=delay)
+                counts['retried'] += 1
+            continue
+
+        notification.status = NotificationOutbox.STATUS_SENT
+        notification.sent_at = timezone.now()
+        notification.attempts += 1
+        counts['sent'] += 1
+
+    with transaction.atomic():
+        if check:
+            check()
+        NotificationOutbox.objects.bulk_update(
+            notifications, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return counts
+
+
+def drain_outbox(batch_size=None, max_batches=None, check=None):
+    """
+    ارسال اعلان‌های سررسید شده صف به صورت دسته‌ای
+
+    ارسال حداقل یک بار است: اگر وورکر بین ارسال و ثبت نتیجه متوقف شود حداکثر همان
+    دسته بعد از پایان مهلت برداشتن دوباره ارسال می‌شود. اعلان‌های بیش از سقف هر گیرنده
+    به بازه بعد موکول می‌شوند.
+
+    Args:
+        check: بررسی قفل تسک (check_task_lock)؛ هنگام برداشتن دسته، قبل از هر ارسال و
+            داخل تراکنش ثبت نتیجه صدا زده می‌شود
+
+    Returns:
+        dict: تعداد اعلان‌های ارسال شده، ناموفق، تلاش دوباره و به تعویق افتاده
+    """
+    batch_size = batch_size or NOTIFICATION_BATCH_SIZE
+    max_batches = max_batches or NOTIFICATION_MAX_BATCHES
+    totals = {'sent': 0, 'failed': 0, 'retried': 0, 'deferred': 0}
+
+    for _ in range(max_batches):
+        notifications, now = _claim_batch(batch_size, check)
+        if not notifications:
+            break
+
+        for key, count in _send_batch(notifications, now, check).items():
+            totals[key] += count
+
+    return totals
@@ -0,0 +1,21 @@
+# apps/order/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.menu.models.menufreemodels.models import Restaurant
+from .expiry import schedule_expiry_events
+
+
+# ----------------------------
+# Restaurant
+# ----------------------------
+@receiver(post_save, sender=Restaurant)
+def schedule_restaurant_expiry(sender, instance, created, **kwargs):
+    """زمان‌بندی رویدادهای انقضا فقط وقتی تاریخ انقضا تغییر کرده باشد"""
+    if not instance.expireDate or not instance.isActive:
+        return
+    if not created and instance.expireDate == getattr(instance, '_previous_expire_date', None):
+        return
+
+    restaurant_id, expire_date = instance.pk, instance.expireDate
+    transaction.on_commit(lambda: schedule_expiry_events(restaurant_id, expire_date))
@@ -2,65 +2,123 @@
 from celery import shared_task
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Max
 from apps.menu.models.menufreemodels.models import Restaurant
-from .models import Ordermenu, MenuImage
+from .models import Ordermenu, MenuImage, OrderDailyStat, NotificationOutbox
+from .notifications import drain_outbox
+from .locks import single_instance_task, check_task_lock
+from .expiry import (
+    EVENT_REMINDER, EVENT_RENEWAL_ORDER, EVENT_DEACTIVATE, expire_timestamp, schedule_upcoming_expiry_events
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def create_renewal_orders_for_expiring_restaurants():
+# تعداد روزهای اخیر که در هر اجرا آمار آنها دوباره ساخته می‌شود
+ORDER_STATS_REFRESH_DAYS = 7
+
+# تعداد رستوران‌هایی که در هر تراکنش سفارش تمدید می‌گیرند
+RENEWAL_ORDER_CHUNK_SIZE = 500
+
+# وضعیت‌هایی که یعنی رستوران سفارش تمدید باز دارد
+RENEWAL_OPEN_STATUSES = [Ordermenu.STATUS_UNPAID, Ordermenu.NOTRENEWED, Ordermenu.STATUS_RENEWAL]
+
+def _create_renewal_orders(restaurants):
     """
-    ایجاد سفارش تمدید برای رستوران‌هایی که ۴ روز تا انقضای آنها باقی مانده است
+    ایجاد سفارش تمدید برای رستوران‌های داده شده‌ای که سفارش تمدید باز ندارند
+
+    رستوران‌های بدون سفارش تمدید باز با یک anti-join (NOT EXISTS) پیدا می‌شوند و
+    سفارش‌ها در دسته‌های RENEWAL_ORDER_CHUNK_SIZE تایی با bulk_create ساخته می‌شوند.
+    ردیف‌های هر دسته قفل می‌شوند (skip_locked) تا دو وورکر همزمان سفارش تکراری نسازند.
+
+    Returns:
+        tuple: (لیست سفارش‌های ایجاد شده، تعداد رستوران‌های بررسی شده)
     """
-    try:
-        # تاریخ ۴ روز آینده
-        four_days_from_now = timezone.now() + timedelta(days=4)
+    # رستوران‌هایی که قبلاً سفارش تمدید فعال دارند حذف می‌شوند
+    open_renewal_orders = Ordermenu.objects.filter(
+        restaurant=OuterRef('pk'),
+        status__in=RENEWAL_OPEN_STATUSES
+    )
+    restaurants = restaurants.filter(isActive=True).filter(~Exists(open_renewal_orders)).order_by('id')
 
-        # پیدا کردن رستوران‌هایی که دقیقاً ۴ روز تا انقضای آنها باقی مانده
-        expiring_restaurants = Restaurant.objects.filter(
-            expireDate__date=four_days_from_now.date(),
-            isActive=True
-        ).exclude(
-            # رستوران‌هایی که قبلاً سفارش تمدید فعال دارند را حذف کن
-            Q(ordermenu__status=Ordermenu.STATUS_UNPAID) |
-            Q(ordermenu__status=Ordermenu.STATUS_RENEWAL)
-        ).distinct()
-
-        created_orders = []
-
-        for restaurant in expiring_restaurants:
-            # بررسی اینکه آیا قبلاً سفارش تمدید برای این رستوران ایجاد شده
-            existing_renewal_order = Ordermenu.objects.filter(
-                restaurant=restaurant,
-                status__in=[Ordermenu.STATUS_UNPAID, Ordermenu.NOTRENEWED, Ordermenu.STATUS_RENEWAL]
-            ).exists()
-
-            if not existing_renewal_order:
+    created_orders = []
+    total_checked = 0
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            # اگر اجاره قفل تسک تمام شده و نمونه دیگری شروع کرده باشد چیزی commit نمی‌شود
+            check_task_lock()
+            chunk = list(
+                restaurants.filter(id__gt=last_id)
+                .select_for_update(skip_locked=True, of=('self',))
+                .values('id', 'title', 'expireDate', 'isSeo', 'owner__email')[:RENEWAL_ORDER_CHUNK_SIZE]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1]['id']
+            total_checked += len(chunk)
+
+            created_at = timezone.now()
+            renewal_orders = []
+            for restaurant in chunk:
                 # ایجاد سفارش تمدید جدید
-                renewal_order = Ordermenu.objects.create(
-                    restaurant=restaurant,
+                order = Ordermenu(
+                    restaurant_id=restaurant['id'],
                     isfinaly=False,
                     isActive=False,
                     status=Ordermenu.NOTRENEWED,  # وضعیت "تمدید نشده"
-                    is_seo_enabled=restaurant.isSeo  # حفظ تنظیمات سئو
+                    is_seo_enabled=bool(restaurant['isSeo']),  # حفظ تنظیمات سئو
+                    created_at=created_at
                 )
+                order.calculate_final_price()
+                renewal_orders.append(order)
 
-                created_orders.append({
-                    'order_id': renewal_order.id,
-                    'restaurant': restaurant.title,
-                    'expire_date': restaurant.expireDate,
-                    'owner': restaurant.owner.email
-                })
+            Ordermenu.objects.bulk_create(renewal_orders)
+
+            # MySQL شناسه ردیف‌های bulk_create را برنمی‌گرداند؛ ردیف‌های همین دسته دوباره خوانده می‌شوند
+            # (هر رستوران قفل شده و سفارش تمدید باز دیگری ندارد، پس نگاشت یکتاست)
+            order_ids = {order.restaurant_id: order.id for order in renewal_orders}
+            if None in order_ids.values():
+                order_ids = dict(Ordermenu.objects.filter(
+                    restaurant_id__in=order_ids,
+                    status=Ordermenu.NOTRENEWED,
+                    created_at=created_at
+                ).values_list('restaurant_id', 'id'))
+
+        for restaurant in chunk:
+            created_orders.append({
+                'order_id': order_ids.get(restaurant['id']),
+                'restaurant': restaurant['title'],
+                'expire_date': restaurant['expireDate'],
+                'owner': restaurant['owner__email']
+            })
+
+        logger.info(f"{len(renewal_orders)} سفارش تمدید ایجاد شد (تا رستوران {last_id})")
+
+    return created_orders, total_checked
+
+
+@shared_task
+@single_instance_task()
+def create_renewal_orders_for_expiring_restaurants():
+    """
+    ایجاد سفارش تمدید برای رستوران‌هایی که ۴ روز تا انقضای آنها باقی مانده است
+    """
+    try:
+        # تاریخ ۴ روز آینده
+        four_days_from_now = timezone.now() + timedelta(days=4)
 
-                logger.info(f"سفارش تمدید برای رستوران {restaurant.title} ایجاد شد (ID: {renewal_order.id})")
+        created_orders, total_checked = _create_renewal_orders(
+            Restaurant.objects.filter(expireDate__date=four_days_from_now.date())
+        )
 
         return {
             'success': True,
             'message': f'{len(created_orders)} سفارش تمدید ایجاد شد',
             'created_orders': created_orders,
-            'total_checked': len(expiring_restaurants)
+            'total_checked': total_checked
         }
 
     except Exception as e:
@@ -71,20 +129,19 @@ def create_renewal_orders_for_expiring_restaurants():
         }
 
 @shared_task
+@single_instance_task()
 def check_and_deactivate_expired_restaurants():
     """
     بررسی و غیرفعال کردن رستوران‌های منقضی شده
     """
     try:
-        expired_restaurants = Restaurant.get_expired_restaurants().filter(isActive=True)
-
-        deactivated_count = 0
-        for restaurant in expired_restaurants:
-            restaurant.isActive = False
-            restaurant.save()
-            deactivated_count += 1
+        with transaction.atomic():
+            check_task_lock()
+            deactivated = Restaurant.deactivate_expired()
+        deactivated_count = len(deactivated)
 
-            logger.info(f"رستوران {restaurant.title} به دلیل انقضا غیرفعال شد")
+        for restaurant_id, title, slug, owner_id in deactivated:
+            logger.info(f"رستوران {title} به دلیل انقضا غیرفعال شد")
 
         return {
             'success': True,
@@ -99,10 +156,50 @@ def check_and_deactivate_expired_restaurants():
             'message': f'خطا در غیرفعال کردن رستوران‌های منقضی شده: {str(e)}'
         }
 
+def _queue_renewal_reminders(restaurants):
+    """
+    ثبت گروهی یادآوری تمدید (ایمیل و پیامک مالک) در صف اعلان‌ها
+
+    برای هر رستوران و تاریخ انقضا فقط یک یادآوری در هر کانال ثبت می‌شود، پس اجرای دوباره
+    (رویداد، sweep یا تسک دستی) یادآوری تکراری نمی‌سازد.
+
+    Returns:
+        int: تعداد اعلان‌های جدید
+    """
+    now = timezone.now()
+    notifications = []
+    rows = restaurants.values('id', 'title', 'expireDate', 'owner_id', 'owner__email', 'owner__mobileNumber')
+    for restaurant in rows:
+        days_until_expiry = max((restaurant['expireDate'] - now).days, 0)
+        subject = f"یادآوری تمدید منوی {restaurant['title']}"
+        body = f"{days_until_expiry} روز تا پایان اعتبار منوی {restaurant['title']} باقی مانده است. برای تمدید به پنل مراجعه کنید."
+        recipients = (
+            (NotificationOutbox.CHANNEL_EMAIL, restaurant['owner__email']),
+            (NotificationOutbox.CHANNEL_SMS, restaurant['owner__mobileNumber']),
+        )
+        for channel, recipient in recipients:
+            if not recipient:
+                continue
+            notifications.append(NotificationOutbox(
+                channel=channel,
+                recipient=recipient,
+                owner_id=restaurant['owner_id'],
+                restaurant_id=restaurant['id'],
+                subject=subject,
+                body=body,
+                dedupe_key=f"renewal-reminder:{restaurant['id']}:{expire_timestamp(restaurant['expireDate'])}:{channel}",
+            ))
+
+    return NotificationOutbox.enqueue_many(notifications)
+
+
 @shared_task
+@single_instance_task()
 def send_renewal_reminders():
     """
     ارسال یادآوری تمدید برای رستوران‌هایی که به زودی منقضی می‌شوند
+
+    یادآوری‌ها فقط در صف اعلان‌ها ثبت می‌شوند و drain_notification_outbox آنها را می‌فرستد.
     """
     try:
         # رستوران‌هایی که بین ۳ تا ۷ روز تا انقضای آنها باقی مانده
@@ -115,19 +212,11 @@ def send_renewal_reminders():
             isActive=True
         )
 
-        reminder_count = 0
-        for restaurant in expiring_soon_restaurants:
-            days_until_expiry = restaurant.days_until_expiry
-
-            # در اینجا می‌توانید ایمیل یا نوتیفیکیشن ارسال کنید
-            # send_renewal_email(restaurant.owner.email, restaurant, days_until_expiry)
-
-            reminder_count += 1
-            logger.info(f"یادآوری تمدید برای رستوران {restaurant.title} ({days_until_expiry} روز باقی مانده)")
+        reminder_count = _queue_renewal_reminders(expiring_soon_restaurants)
 
         return {
             'success': True,
-            'message': f'{reminder_count} یادآوری تمدید ارسال شد',
+            'message': f'{reminder_count} یادآوری تمدید در صف ارسال قرار گرفت',
             'reminder_count': reminder_count
         }
 
@@ -136,4 +225,167 @@ def send_renewal_reminders():
         return {
             'success': False,
             'message': f'خطا در ارسال یادآوری‌های تمدید: {str(e)}'
-        }
\ No newline at end of file
+        }
+
+@shared_task
+@single_instance_task()
+def update_order_daily_stats(days=ORDER_STATS_REFRESH_DAYS):
+    """
+    به‌روزرسانی آمار روزانه سفارشات و پرداخت‌ها برای چند روز اخیر
+
+    روزهای قدیمی‌تری که سفارش یا پرداختی از آنها بعد از اجرای قبلی تغییر کرده
+    (مثلاً پرداخت یا لغو دیرهنگام) هم دوباره ساخته می‌شوند.
+    اگر جدول آمار خالی باشد (اولین اجرا) یا days برابر None باشد کل تاریخچه ساخته می‌شود.
+    """
+    try:
+        # زمان شروع قبل از خواندن داده‌ها ثبت می‌شود تا تغییرات حین اجرا در اجرای بعد دیده شوند
+        run_started_at = timezone.now()
+        start_date, changed_dates = None, set()
+        if days is not None and OrderDailyStat.objects.exists():
+            start_date = run_started_at.date() - timedelta(days=days)
+            last_run = OrderDailyStat.last_refresh() or OrderDailyStat.objects.aggregate(
+                last_run=Max('updated_at')
+            )['last_run']
+            if last_run:
+                changed_dates = OrderDailyStat.changed_dates(last_run)
+
+        with transaction.atomic():
+            check_task_lock()
+            row_count = OrderDailyStat.refresh(start_date, changed_dates)
+        OrderDailyStat.mark_refreshed(run_started_at)
+        logger.info(
+            f"آمار روزانه سفارشات از {start_date or 'ابتدا'} و {len(changed_dates)} روز تغییر کرده "
+            f"به‌روزرسانی شد ({row_count} ردیف)"
+        )
+
+        return {
+            'success': True,
+            'message': f'{row_count} ردیف آمار روزانه به‌روزرسانی شد',
+            'row_count': row_count
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در به‌روزرسانی آمار روزانه سفارشات: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در به‌روزرسانی آمار روزانه سفارشات: {str(e)}'
+        }
+
+
+# ----------------------------
+# زمان‌بندی رویدادهای انقضا
+# ----------------------------
+@shared_task
+def handle_restaurant_expiry_event(restaurant_id, event, expire_ts):
+    """
+    اجرای یک رویداد انقضای رستوران (یادآوری، سفارش تمدید یا غیرفعال‌سازی)
+
+    اگر تاریخ انقضای رستوران بعد از زمان‌بندی تغییر کرده باشد (مثلاً تمدید شده) رویداد
+    نادیده گرفته می‌شود؛ رویدادهای تاریخ جدید جداگانه زمان‌بندی شده‌اند.
+    """
+    try:
+        restaurant = Restaurant.objects.filter(id=restaurant_id, isActive=True).first()
+        if restaurant is None or not restaurant.expireDate or expire_timestamp(restaurant.expireDate) != expire_ts:
+            return {
+                'success': True,
+                'message': 'رویداد منقضی شده است',
+                'event': event
+            }
+
+        if event == EVENT_REMINDER:
+            _queue_renewal_reminders(Restaurant.objects.filter(id=restaurant_id))
+        elif event == EVENT_RENEWAL_ORDER:
+            _create_renewal_orders(Restaurant.objects.filter(id=restaurant_id))
+        elif event == EVENT_DEACTIVATE:
+            for _, title, _, _ in Restaurant.deactivate_expired(restaurant_ids=[restaurant_id]):
+                logger.info(f"رستوران {title} به دلیل انقضا غیرفعال شد")
+
+        return {
+            'success': True,
+            'message': f'رویداد {event} برای رستوران {restaurant.title} اجرا شد',
+            'event': event
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در اجرای رویداد انقضای رستوران {restaurant_id}: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در اجرای رویداد انقضا: {str(e)}'
+        }
+
+
+@shared_task
+@single_instance_task()
+def sweep_restaurant_expiry():
+    """
+    زمان‌بندی رویدادهای انقضای دوره بعد و جبران رویدادهای جا افتاده
+
+    رویدادها با تغییر تاریخ انقضا (سیگنال) زمان‌بندی می‌شوند؛ این تسک فقط هر
+    EXPIRY_SWEEP_INTERVAL ثانیه اجرا می‌شود تا رویدادهای دورتر را در صف بگذارد و
+    رستوران‌هایی را که رویدادشان از دست رفته (مثلاً خاموشی وورکر) پوشش دهد.
+    """
+    try:
+        now = timezone.now()
+        scheduled = schedule_upcoming_expiry_events(now)
+
+        with transaction.atomic():
+            check_task_lock()
+            deactivated = Restaurant.deactivate_expired()
+        for _, title, _, _ in deactivated:
+            logger.info(f"رستوران {title} به دلیل انقضا غیرفعال شد")
+
+        created_orders, _ = _create_renewal_orders(
+            Restaurant.objects.filter(expireDate__gt=now, expireDate__lte=now + timedelta(days=4))
+        )
+
+        # یادآوری‌ها کلید یکتا دارند؛ فقط یادآوری‌های جا افتاده ثبت می‌شوند
+        reminder_count = _queue_renewal_reminders(Restaurant.objects.filter(
+            isActive=True,
+            expireDate__gte=now + timedelta(days=3),
+            expireDate__lte=now + timedelta(days=7)
+        ))
+
+        return {
+            'success': True,
+            'message': f'{scheduled} رویداد زمان‌بندی شد، {len(deactivated)} رستوران غیرفعال و '
+                       f'{len(created_orders)} سفارش تمدید ایجاد شد',
+            'scheduled': scheduled,
+            'deactivated_count': len(deactivated),
+            'created_orders_count': len(created_orders),
+            'reminder_count': reminder_count
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در بررسی انقضای رستوران‌ها: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در بررسی انقضای رستوران‌ها: {str(e)}'
+        }
+
+
+# ----------------------------
+# صف اعلان‌ها
+# ----------------------------
+@shared_task
+@single_instance_task()
+def drain_notification_outbox():
+    """
+    ارسال دسته‌ای اعلان‌های صف (با محدودیت هر گیرنده و تلاش دوباره با تأخیر افزایشی)
+    """
+    try:
+        result = drain_outbox(check=check_task_lock)
+        if any(result.values()):
+            logger.info(f"صف اعلان‌ها: {result}")
+
+        return {
+            'success': True,
+            'message': f"{result['sent']} اعلان ارسال شد",
+            **result
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در ارسال صف اعلان‌ها: {str(e)}")
+        return {
+            'success': False,
+            'message': f'خطا در ارسال صف اعلان‌ها: {str(e)}'
+        }
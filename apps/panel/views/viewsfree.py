@@ -1,11 +1,17 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponseRedirect, Http404
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef
+from django.core.paginator import Paginator
+from django.db import transaction
 import json
 from apps.menu.models.menufreemodels.models import Restaurant, Category, MenuCategory, Food
+from apps.menu.snapshot import build_menu_snapshot
+from apps.menu.cache import resolve_restaurant, get_owner_restaurants, bump_menu_versions
+from apps.menu.ordering import move_item, ORDER_STEP
+from apps.menu.categories import get_active_category_tree
 from apps.order.models import Ordermenu, MenuImage
 from django.utils import timezone
 from django.db.models import Count, Sum
@@ -15,78 +21,68 @@ import base64
 from io import BytesIO
 from django.urls import reverse
 from django.contrib import messages
+from django.utils.functional import SimpleLazyObject
+from functools import wraps
+
+
+# تعداد سفارشات هر صفحه در داشبورد
+DASHBOARD_ORDERS_PAGE_SIZE = 20
+
+# صفحه‌بندی لیست غذاهای شرکت در پنل مدیریت منو
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
 
 
 # دکوراتور برای بررسی مالکیت رستوران
 def restaurant_owner_required(view_func):
+    @wraps(view_func)
     def wrapper(request, slug, *args, **kwargs):
         if not request.user.is_authenticated:
             return redirect('account:login')
 
-        restaurant = get_object_or_404(Restaurant, slug=slug, isActive=True)
+        # بررسی وجود و مالکیت رستوران از کش (بدون کوئری)
+        ref = resolve_restaurant(slug)
+        if ref is None or not ref.isActive:
+            raise Http404("No Restaurant matches the given query.")
 
-        # بررسی مالکیت
-        if restaurant.owner != request.user:
+        if ref.owner_id != request.user.id:
             return HttpResponseForbidden("شما دسترسی به این رستوران را ندارید")
 
-        request.restaurant = restaurant
+        # خود رستوران فقط در صورت استفاده در ویو بارگذاری می‌شود
+        request.restaurant = SimpleLazyObject(
+            lambda: get_object_or_404(Restaurant, pk=ref.id, isActive=True)
+        )
         return view_func(request, slug, *args, **kwargs)
     return wrapper
 
 @login_required
 def panel(request):
     """پنل اصلی - نمایش رستوران‌های کاربر و سفارشات"""
-    user_restaurants = Restaurant.objects.filter(owner=request.user, isActive=True)
-
-    # دریافت سفارشات کاربر
-    user_orders = Ordermenu.objects.filter(restaurant__owner=request.user).select_related('restaurant').prefetch_related('images')
-
-    # محاسبه آمار واقعی
-    today = timezone.now().date()
-
-    # سفارشات پرداخت شده
-    paid_orders = user_orders.filter(status=Ordermenu.STATUS_PAID)
-
-    # سفارشات تایید شده
-    confirmed_orders = user_orders.filter(status=Ordermenu.STATUS_CONFIRMED)
-
-    # سفارشات تحویل شده
-    delivered_orders = user_orders.filter(status=Ordermenu.STATUS_DELIVERED)
+    user_restaurants = get_owner_restaurants(request.user.id)
 
-    # سفارشات پرداخت نشده
-    unpaid_orders = user_orders.filter(status=Ordermenu.STATUS_UNPAID)
-
-    # آمار سفارشات امروز
-    today_orders_count = user_orders.filter(created_at__date=today).count()
-
-    # آمار سفارشات این ماه
-    month_start = today.replace(day=1)
-    monthly_orders_count = user_orders.filter(created_at__date__gte=month_start).count()
-
-    # محاسبه درآمد واقعی
-    today_revenue = sum(order.final_price for order in user_orders.filter(
-        created_at__date=today,
-        status__in=[Ordermenu.STATUS_PAID, Ordermenu.STATUS_CONFIRMED, Ordermenu.STATUS_DELIVERED]
-    )) // 10  # تبدیل به تومان
+    # سفارشات کاربر (صفحه‌بندی شده، جدیدترین اول)
+    user_orders = Ordermenu.objects.filter(
+        restaurant__owner=request.user
+    ).select_related('restaurant').prefetch_related('images').order_by('-created_at', '-id')
+    orders_page = Paginator(user_orders, DASHBOARD_ORDERS_PAGE_SIZE).get_page(request.GET.get('page'))
 
-    monthly_revenue = sum(order.final_price for order in user_orders.filter(
-        created_at__date__gte=month_start,
-        status__in=[Ordermenu.STATUS_PAID, Ordermenu.STATUS_CONFIRMED, Ordermenu.STATUS_DELIVERED]
-    )) // 10  # تبدیل به تومان
+    # محاسبه آمار واقعی (یک کوئری)
+    stats = Ordermenu.get_dashboard_stats(request.user)
 
     context = {
         'restaurants': user_restaurants,
-        'has_restaurant': user_restaurants.exists(),
-        'user_orders': user_orders,
-        'paid_orders': paid_orders,
-        'confirmed_orders': confirmed_orders,
-        'delivered_orders': delivered_orders,
-        'unpaid_orders': unpaid_orders,
-        'today_orders': today_orders_count,
-        'monthly_orders': monthly_orders_count,
-        'today_revenue': today_revenue,
-        'monthly_revenue': monthly_revenue,
-        'purchased_menus': paid_orders.count(),
+        'has_restaurant': bool(user_restaurants),
+        'user_orders': orders_page,
+        'orders_page': orders_page,
+        'paid_orders': stats['paid_count'],
+        'confirmed_orders': stats['confirmed_count'],
+        'delivered_orders': stats['delivered_count'],
+        'unpaid_orders': stats['unpaid_count'],
+        'today_orders': stats['today_count'],
+        'monthly_orders': stats['monthly_count'],
+        'today_revenue': stats['today_revenue'] // 10,  # تبدیل به تومان
+        'monthly_revenue': stats['monthly_revenue'] // 10,  # تبدیل به تومان
+        'purchased_menus': stats['paid_count'],
     }
 
     return render(request, 'panel_app/free/panel.html', context)
@@ -342,12 +338,8 @@ def restaurant_admin(request, slug):
         restaurants=restaurant
     ).select_related('menuCategory__category').order_by('displayOrder')
 
-    # دریافت تمام غذاهای شرکت (برای نمایش همه غذاها)
-    all_company_foods = Food.objects.filter(
-        isActive=True
-    ).select_related('menuCategory__category').order_by('displayOrder')
-
     # لیست ID غذاهای انتخاب شده
+    # (غذاهای شرکت صفحه به صفحه از company_food_catalog بارگذاری می‌شوند)
     selected_food_ids = list(selected_foods.values_list('id', flat=True))
 
     # محاسبه اطلاعات انقضا برای نمایش در UI (فقط اگر منقضی نشده باشد)
@@ -363,7 +355,7 @@ def restaurant_admin(request, slug):
         'menu_categories': menu_categories,
         'all_categories': all_categories,
         'foods': selected_foods,
-        'all_foods': all_company_foods,
+        'catalog_page_size': CATALOG_PAGE_SIZE,
         'selected_food_ids': selected_food_ids,
         'categories': Category.objects.filter(isActive=True),
         'expiry_info': expiry_info,
@@ -414,6 +406,9 @@ def add_food(request, slug):
         # سپس رستوران را به رابطه Many-to-Many اضافه کنید
         food.restaurants.add(restaurant)
 
+        # بازسازی نسخه آماده منوی عمومی
+        build_menu_snapshot(restaurant)
+
         return JsonResponse({
             'success': True,
             'message': 'غذا با موفقیت اضافه شد',
@@ -463,6 +458,7 @@ def update_food(request, slug, food_id):
             food.sound = files['sound']
 
         food.save()
+        build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -492,6 +488,8 @@ def delete_food(request, slug, food_id):
         if not food.restaurants.exists():
             food.delete()
 
+        build_menu_snapshot(restaurant)
+
         return JsonResponse({
             'success': True,
             'message': 'غذا با موفقیت از رستوران حذف شد'
@@ -514,6 +512,7 @@ def toggle_food_status(request, slug, food_id):
     try:
         food.isActive = not food.isActive
         food.save()
+        build_menu_snapshot(restaurant)
 
         status = "فعال" if food.isActive else "غیرفعال"
         return JsonResponse({
@@ -569,6 +568,7 @@ def add_menu_category(request, slug):
             menu_category.customImage = files['custom_image']
 
         menu_category.save()
+        build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -596,6 +596,7 @@ def toggle_menu_category_status(request, slug, menu_category_id):
     try:
         menu_category.isActive = not menu_category.isActive
         menu_category.save()
+        build_menu_snapshot(restaurant)
 
         status = "فعال" if menu_category.isActive else "غیرفعال"
         return JsonResponse({
@@ -628,6 +629,7 @@ def delete_menu_category(request, slug, menu_category_id):
             })
 
         menu_category.delete()
+        build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -682,6 +684,7 @@ def update_restaurant_settings(request, slug):
             restaurant.coverImage = files['cover_image']
 
         restaurant.save()
+        build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -725,6 +728,70 @@ def get_foods_by_category(request, slug, category_id=None):
         'foods': foods_data
     })
 
+@login_required
+@restaurant_owner_required
+def company_food_catalog(request, slug):
+    """
+    لیست صفحه‌بندی شده غذاهای شرکت برای انتخاب در منو (API)
+
+    پارامترها: page، page_size، category (شناسه دسته‌بندی)، q (متن جستجو)،
+    selected (1 فقط انتخاب شده‌ها، 0 فقط انتخاب نشده‌ها)
+    """
+    restaurant = request.restaurant
+
+    try:
+        page_size = int(request.GET.get('page_size', CATALOG_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = CATALOG_PAGE_SIZE
+    page_size = max(1, min(page_size, CATALOG_MAX_PAGE_SIZE))
+
+    foods = Food.objects.filter(isActive=True).annotate(
+        selected=Exists(Food.restaurants.through.objects.filter(food_id=OuterRef('pk'), restaurant_id=restaurant.id))
+    ).select_related('menuCategory__category').order_by('displayOrder', 'id')
+
+    category_id = request.GET.get('category')
+    if category_id and category_id != 'all':
+        if not category_id.isdigit():
+            return JsonResponse({'success': False, 'message': 'دسته‌بندی نامعتبر است'}, status=400)
+        foods = foods.filter(menuCategory__category__id=category_id)
+
+    query = request.GET.get('q', '').strip()
+    if query:
+        foods = foods.filter(
+            Q(title__icontains=query) | Q(title_en__icontains=query) | Q(description__icontains=query)
+        )
+
+    selected = request.GET.get('selected')
+    if selected in ('0', '1'):
+        foods = foods.filter(selected=selected == '1')
+
+    paginator = Paginator(foods, page_size)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    foods_data = []
+    for food in page_obj:
+        category = food.menuCategory.category if food.menuCategory else None
+        foods_data.append({
+            'id': food.id,
+            'title': food.title,
+            'description': food.description,
+            'price': food.price,
+            'preparation_time': food.preparationTime,
+            'image_url': food.image.url if food.image else '',
+            'category_name': category.title if category else 'بدون دسته',
+            'category_id': category.id if category else None,
+            'is_active': food.isActive,
+            'selected': food.selected
+        })
+
+    return JsonResponse({
+        'success': True,
+        'foods': foods_data,
+        'page': page_obj.number,
+        'has_next': page_obj.has_next(),
+        'total': paginator.count
+    })
+
 @login_required
 @restaurant_owner_required
 @csrf_exempt
@@ -736,11 +803,11 @@ def update_food_order(request, slug):
     try:
         data = json.loads(request.body)
         order_data = data.get('order', [])
+        positions = {int(item['id']): float(item['order']) for item in order_data}
 
-        for item in order_data:
-            food = get_object_or_404(Food, id=item['id'], restaurants=restaurant)
-            food.displayOrder = item['order']
-            food.save()
+        if positions:
+            Food.reorder_for_restaurant(restaurant, positions)
+            build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -753,30 +820,112 @@ def update_food_order(request, slug):
             'message': f'خطا در به‌روزرسانی ترتیب: {str(e)}'
         })
 
-# Context Processor
-def restaurant_context(request):
-    """Context processor برای دسترسی به رستوران‌های کاربر در همه تمپلیت‌ها"""
-    context = {}
+def _move_payload(request):
+    data = json.loads(request.body)
+    prev_id = data.get('prev_id')
+    next_id = data.get('next_id')
+    return (int(prev_id) if prev_id else None), (int(next_id) if next_id else None)
 
-    if request.user.is_authenticated:
-        user_restaurants = Restaurant.objects.filter(owner=request.user, isActive=True)
-        context['user_restaurants'] = user_restaurants
 
-        current_restaurant_slug = request.session.get('current_restaurant_slug')
-        if current_restaurant_slug:
-            try:
-                current_restaurant = Restaurant.objects.get(
-                    slug=current_restaurant_slug,
-                    owner=request.user,
-                    isActive=True
-                )
-                context['current_restaurant'] = current_restaurant
-                context['current_restaurant_slug'] = current_restaurant_slug
-            except Restaurant.DoesNotExist:
-                if 'current_restaurant_slug' in request.session:
-                    del request.session['current_restaurant_slug']
+@login_required
+@restaurant_owner_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def move_food(request, slug, food_id):
+    """جابجایی یک غذا بین دو غذای دیگر (فقط همان غذا ذخیره می‌شود)"""
+    restaurant = request.restaurant
+
+    try:
+        prev_id, next_id = _move_payload(request)
+        display_order, changed_ids = move_item(
+            Food.objects.filter(restaurants=restaurant), food_id, prev_id, next_id
+        )
+
+        # غذاهای شرکت بین چند رستوران مشترک هستند؛ منوی هر رستورانی که یکی از غذاهای
+        # جابجا شده را دارد نامعتبر می‌شود
+        bump_menu_versions(
+            Restaurant.objects.filter(foods__id__in=changed_ids).values_list('slug', flat=True).distinct()
+        )
+        build_menu_snapshot(restaurant)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'ترتیب نمایش با موفقیت به‌روزرسانی شد',
+            'display_order': display_order
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'خطا در به‌روزرسانی ترتیب: {str(e)}'
+        })
+
+
+@login_required
+@restaurant_owner_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def move_menu_category(request, slug, menu_category_id):
+    """جابجایی یک دسته‌بندی منو بین دو دسته‌بندی دیگر"""
+    restaurant = request.restaurant
+
+    try:
+        prev_id, next_id = _move_payload(request)
+        display_order, _ = move_item(
+            MenuCategory.objects.filter(restaurant=restaurant), menu_category_id, prev_id, next_id
+        )
+
+        bump_menu_versions([restaurant.slug])
+        build_menu_snapshot(restaurant)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'ترتیب نمایش با موفقیت به‌روزرسانی شد',
+            'display_order': display_order
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'خطا در به‌روزرسانی ترتیب: {str(e)}'
+        })
 
-    return context
+# Context Processor
+def restaurant_context(request):
+    """
+    Context processor برای دسترسی به رستوران‌های کاربر در همه تمپلیت‌ها
+
+    مقادیر به صورت lazy ساخته می‌شوند و فقط وقتی تمپلیت از آنها استفاده کند
+    (از کش رستوران‌های کاربر) خوانده می‌شوند.
+    """
+    def user_restaurants():
+        if not hasattr(request, '_user_restaurants'):
+            request._user_restaurants = []
+            if request.user.is_authenticated:
+                request._user_restaurants = get_owner_restaurants(request.user.id)
+        return request._user_restaurants
+
+    def current_restaurant():
+        current_restaurant_slug = request.session.get('current_restaurant_slug')
+        if not current_restaurant_slug:
+            return None
+        for restaurant in user_restaurants():
+            if restaurant.slug == current_restaurant_slug:
+                return restaurant
+        if request.user.is_authenticated:
+            del request.session['current_restaurant_slug']
+        return None
+
+    def current_restaurant_slug():
+        restaurant = lazy_current_restaurant
+        return restaurant.slug if restaurant else ''
+
+    lazy_current_restaurant = SimpleLazyObject(current_restaurant)
+    return {
+        'user_restaurants': SimpleLazyObject(user_restaurants),
+        'current_restaurant': lazy_current_restaurant,
+        'current_restaurant_slug': SimpleLazyObject(current_restaurant_slug),
+    }
 
 @login_required
 @csrf_exempt
@@ -1002,31 +1151,21 @@ def check_english_name(request):
 def get_category_tree(request, slug):
     """دریافت درخت دسته‌بندی‌ها به صورت سلسله‌مراتبی"""
     try:
-        parent_categories = Category.objects.filter(
-            parent=None,
-            isActive=True
-        ).prefetch_related('children').order_by('displayOrder')
-
+        # درخت از حافظه پروسس (فقط با تغییر دسته‌بندی‌ها دوباره ساخته می‌شود)
         categories_data = []
-        for parent in parent_categories:
-            parent_data = {
-                'id': parent.id,
-                'title': parent.title,
-                'image_url': parent.image.url if parent.image else '',
-                'has_children': parent.is_parent,
-                'subcategories': []
-            }
-
-            for child in parent.active_subcategories:
-                child_data = {
-                    'id': child.id,
-                    'title': child.title,
-                    'image_url': child.image.url if child.image else '',
-                    'parent_title': parent.title
-                }
-                parent_data['subcategories'].append(child_data)
-
-            categories_data.append(parent_data)
+        for parent in get_active_category_tree():
+            categories_data.append({
+                'id': parent['id'],
+                'title': parent['title'],
+                'image_url': parent['image_url'],
+                'has_children': bool(parent['children']),
+                'subcategories': [{
+                    'id': child['id'],
+                    'title': child['title'],
+                    'image_url': child['image_url'],
+                    'parent_title': parent['title']
+                } for child in parent['children']]
+            })
 
         return JsonResponse({
             'success': True,
@@ -1064,26 +1203,40 @@ def quick_add_menu_category(request, slug):
                 'message': 'برخی از دسته‌بندی‌ها یافت نشدند'
             })
 
-        added_categories = []
-        skipped_categories = []
+        # دسته‌بندی‌های موجود و آخرین کلید ترتیب منو با یک کوئری
+        existing = dict(MenuCategory.objects.filter(restaurant=restaurant).values_list('category_id', 'displayOrder'))
+        last_order = max((key for key in existing.values() if key is not None), default=0)
 
-        for category in categories:
-            if MenuCategory.objects.filter(restaurant=restaurant, category=category).exists():
-                skipped_categories.append(category.title)
-                continue
+        skipped_categories = [category.title for category in categories if category.id in existing]
+        new_categories = [category for category in categories if category.id not in existing]
 
-            menu_category = MenuCategory(
+        menu_categories = [
+            MenuCategory(
                 restaurant=restaurant,
                 category=category,
-                isActive=True
+                isActive=True,
+                displayOrder=last_order + position * ORDER_STEP
             )
-            menu_category.save()
-            added_categories.append({
-                'id': menu_category.id,
-                'title': category.title,
-                'image_url': menu_category.displayImage.url if menu_category.displayImage else '',
-                'has_custom_image': bool(menu_category.customImage)
-            })
+            for position, category in enumerate(new_categories, start=1)
+        ]
+        # درخواست همزمان با همین دسته‌بندی‌ها توسط unique_together نادیده گرفته می‌شود
+        MenuCategory.objects.bulk_create(menu_categories, ignore_conflicts=True)
+
+        created_ids = dict(MenuCategory.objects.filter(
+            restaurant=restaurant,
+            category__in=new_categories
+        ).values_list('category_id', 'id')) if new_categories else {}
+
+        added_categories = [{
+            'id': created_ids.get(category.id),
+            'title': category.title,
+            'image_url': category.image.url if category.image else '',
+            'has_custom_image': False
+        } for category in new_categories]
+
+        if added_categories:
+            bump_menu_versions([restaurant.slug])
+            build_menu_snapshot(restaurant)
 
         message = ""
         if added_categories:
@@ -1191,6 +1344,8 @@ def toggle_food_selection(request, slug, food_id):
             selected = True
             message = "غذا به منو اضافه شد"
 
+        build_menu_snapshot(restaurant)
+
         return JsonResponse({
             'success': True,
             'message': message,
@@ -1204,6 +1359,61 @@ def toggle_food_selection(request, slug, food_id):
             'message': f'خطا در تغییر وضعیت: {str(e)}'
         })
 
+@login_required
+@restaurant_owner_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def update_food_selection(request, slug):
+    """افزودن و حذف گروهی غذاها از منوی رستوران در یک درخواست"""
+    restaurant = request.restaurant
+
+    try:
+        data = json.loads(request.body)
+        add_ids = {int(food_id) for food_id in data.get('add', [])}
+        remove_ids = {int(food_id) for food_id in data.get('remove', [])}
+
+        if not add_ids and not remove_ids:
+            return JsonResponse({
+                'success': False,
+                'message': 'لطفاً حداقل یک غذا انتخاب کنید'
+            })
+
+        if add_ids & remove_ids:
+            return JsonResponse({
+                'success': False,
+                'message': 'یک غذا نمی‌تواند همزمان اضافه و حذف شود'
+            })
+
+        if add_ids:
+            active_ids = set(Food.objects.filter(id__in=add_ids, isActive=True).values_list('id', flat=True))
+            if active_ids != add_ids:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'برخی از غذاها یافت نشدند'
+                })
+
+        # یک DELETE و یک INSERT گروهی روی جدول واسط
+        with transaction.atomic():
+            if remove_ids:
+                restaurant.foods.remove(*remove_ids)
+            if add_ids:
+                restaurant.foods.add(*add_ids)
+
+        build_menu_snapshot(restaurant)
+        selected_ids = list(restaurant.foods.values_list('id', flat=True))
+
+        return JsonResponse({
+            'success': True,
+            'message': f'{len(add_ids)} غذا اضافه و {len(remove_ids)} غذا از منو حذف شد',
+            'selected_food_ids': selected_ids
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'خطا در به‌روزرسانی غذاهای منو: {str(e)}'
+        })
+
 @login_required
 @restaurant_owner_required
 @csrf_exempt
@@ -1225,6 +1435,7 @@ def assign_food_to_category(request, slug, food_id):
             food.menuCategory = None
 
         food.save()
+        build_menu_snapshot(restaurant)
 
         return JsonResponse({
             'success': True,
@@ -11,17 +11,27 @@ app.autodiscover_tasks()
 
 
 app.conf.beat_schedule = {
-    'create-renewal-orders-daily': {
-        'task': 'apps.order.tasks.create_renewal_orders_for_expiring_restaurants',
-        'schedule': 10.0,  # هر ۲۴ ساعت
+    # رویدادهای انقضا (یادآوری، سفارش تمدید، غیرفعال‌سازی) با تغییر تاریخ انقضا زمان‌بندی می‌شوند؛
+    # این sweep فقط رویدادهای ساعت بعد را در صف می‌گذارد و موارد جا افتاده را جبران می‌کند
+    'sweep-restaurant-expiry': {
+        'task': 'apps.order.tasks.sweep_restaurant_expiry',
+        'schedule': 60 * 60,  # هر ساعت
     },
-    'check-expired-restaurants-daily': {
-        'task': 'apps.order.tasks.check_and_deactivate_expired_restaurants',
-        'schedule': 10.0,  # هر ۲۴ ساعت
+    'drain-notification-outbox': {
+        'task': 'apps.order.tasks.drain_notification_outbox',
+        'schedule': 60.0,  # هر دقیقه (فقط اعلان‌های سررسید شده)
     },
-    'send-renewal-reminders-daily': {
-        'task': 'apps.order.tasks.send_renewal_reminders',
-        'schedule': 10.0,  # هر ۲۴ ساعت
+    'update-order-daily-stats': {
+        'task': 'apps.order.tasks.update_order_daily_stats',
+        'schedule': 900.0,  # هر ۱۵ دقیقه (فقط روزهای اخیر)
+    },
+    'rebalance-menu-ordering': {
+        'task': 'apps.menu.tasks.rebalance_menu_ordering_task',
+        'schedule': 60 * 60 * 24,  # روزانه
+    },
+    'export-static-menus': {
+        'task': 'apps.menu.tasks.export_static_menus_task',
+        'schedule': 300.0,  # هر ۵ دقیقه (فقط منوهای تغییر کرده رندر می‌شوند)
     },
 }
 
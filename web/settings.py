@@ -181,10 +181,11 @@ CKEDITOR_CONFIGS = {
 }
 
 # settings.py
+# کش پیش‌فرض بین همه وورکرها مشترک است تا نسخه منوها همه‌جا یکسان باطل شود
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/1',
     },
     'tokens': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -192,6 +193,25 @@ CACHES = {
     }
 }
 
+# مدت نگهداری صفحه رندر شده منوی دیجیتال (ثانیه)
+MENU_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# خروجی استاتیک منوها برای سرو مستقیم توسط nginx
+# location /menu/<slug>/ -> static_menus/<slug>/index.html (index.en.html برای ?lang=en)
+# location /menu/<slug>/menu.json -> static_menus/<slug>/menu.json (menu.en.json برای ?lang=en)
+STATIC_MENU_ROOT = os.path.join(BASE_DIR, 'static_menus/')
+STATIC_MENU_BASE_URL = 'http://localhost:8000'
+
+# ارسال اعلان‌ها (صف NotificationOutbox) برای هر کانال
+# گزینه‌ها: apps.order.notifications.ConsoleSender / FileSender / EmailSender / SmsSender
+NOTIFICATION_SENDERS = {
+    'email': 'apps.order.notifications.ConsoleSender',
+    'sms': 'apps.order.notifications.ConsoleSender',
+}
+NOTIFICATION_FILE_PATH = os.path.join(BASE_DIR, 'notifications.log')
+SMS_GATEWAY_URL = ''
+SMS_API_KEY = ''
+
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'django-db'
 CELERY_ACCEPT_CONTENT = ['json']